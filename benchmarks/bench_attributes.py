@@ -0,0 +1,37 @@
+"""
+Micro-benchmark of attribute serialization, the innermost loop of every 2D render.
+
+Compares the generic `attributes()` scan over the full attribute description with the
+serializer compiled by `compile_attributes()` (used by all functions of `define_svg_element`).
+
+Usage:
+    python benchmarks/bench_attributes.py
+"""
+
+import timeit
+
+from svg_snip.Elements import attributes, compile_attributes, circle_attributes, text_attributes
+
+
+CASES = {
+    'circle (4 kwargs)': (circle_attributes, dict(cx=10.5, cy=20.25, r=3, fill='red')),
+    'text (3 kwargs)': (text_attributes, dict(x=1.0, y=2.0, font_size=12)),
+    'text (8 kwargs)': (text_attributes, dict(x=1.0, y=2.0, font_size=12, font_family='serif', fill='blue',
+                                              stroke='none', text_anchor='middle', transform='rotate(3)')),
+}
+
+
+def main(number=100000):
+    print(f"{'case':<20} {'attributes()':>14} {'compiled':>14} {'speedup':>8}")
+    for name, (description, kwargs) in CASES.items():
+        args = description['args']
+        serialize = compile_attributes(args)
+        assert serialize(kwargs) == attributes(args, **kwargs)
+        generic = min(timeit.repeat(lambda: attributes(args, **kwargs), number=number, repeat=3))
+        compiled = min(timeit.repeat(lambda: serialize(kwargs), number=number, repeat=3))
+        print(f'{name:<20} {generic / number * 1e6:>11.2f} us {compiled / number * 1e6:>11.2f} us '
+              f'{generic / compiled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Benchmark suite of reproducible synthetic scenes covering the render hot paths.
+
+For every scene, the best wall time of a few repetitions, the peak memory traced during one
+additional render (`tracemalloc`) and the size of the output in bytes are reported.
+Results can be stored as JSON and compared against a previously stored baseline.
+
+Usage:
+    python benchmarks/bench_render.py                              # run all scenes
+    python benchmarks/bench_render.py circles arrows               # run selected scenes
+    python benchmarks/bench_render.py --save baseline.json         # store results
+    python benchmarks/bench_render.py --baseline baseline.json     # compare against stored results
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+import numpy as np
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Images import image_cache
+import svg_snip.Elements as Elements
+import svg_snip.Elements3D as Elements3D
+
+
+def projection(yaw, width=800, height=600, distance=400.0, focal_length=800.0):
+    """Perspective projection matrix looking at the origin from `distance`, rotated by `yaw` about the y-axis."""
+    c, s = np.cos(yaw), np.sin(yaw)
+    rotation = np.array([[c, 0, s, 0], [0, 1, 0, 0], [-s, 0, c, 0], [0, 0, 0, 1]])
+    K = np.array([[focal_length, 0, width / 2], [0, focal_length, height / 2], [0, 0, 1]])
+    Rt = np.hstack([np.eye(3), [[0], [0], [distance]]])
+    return K @ Rt @ rotation
+
+
+def scene_circles(n=100000):
+    """Many independent `circle` calls."""
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 1000, size=(n, 2))
+    r = rng.uniform(1, 5, size=n)
+    svg = Composer((1000, 1000))
+    for (x, y), radius in zip(xy.tolist(), r.tolist()):
+        svg.add(Elements.circle, cx=x, cy=y, r=radius, fill='red')
+    return lambda: svg.render()
+
+
+def scene_nested_groups(depth=12, breadth=2):
+    """A full tree of nested `Group`s with transforms and a few elements per group."""
+    def build(level):
+        group = Group(f'level {level}')
+        group.add(Elements.rect, x=level, y=level, width=10, height=10, fill='blue')
+        group.add(Elements.text, x=level, y=level, content=f'L{level}', font_size=8)
+        if level < depth:
+            for i in range(breadth):
+                group.add(build(level + 1), transform=f'translate({i * 3} {level}) scale(0.9)')
+        return group
+
+    svg = Composer((800, 800))
+    svg.add(build(1))
+    return lambda: svg.render()
+
+
+def scene_arrows(n=20000):
+    """Arrows with all marker types, which have to be collected in <defs>."""
+    rng = np.random.default_rng(1)
+    ends = rng.uniform(0, 1000, size=(n, 4)).tolist()
+    heads = ['arrow-small', 'arrow-large', 'circle', 'star']
+    svg = Composer((1000, 1000))
+    for i, (x1, y1, x2, y2) in enumerate(ends):
+        svg.add(Elements.arrow, x1=x1, y1=y1, x2=x2, y2=y2, head=heads[i % len(heads)])
+    return lambda: svg.render()
+
+
+def scene_spheres_3d(frames=20, n=20):
+    """`Elements3D.sphere` and `Elements3D.volume` re-rendered under a new projection matrix per frame."""
+    rng = np.random.default_rng(2)
+    centers = rng.uniform(-100, 100, size=(n, 3))
+    svg = Composer((800, 600))
+    for center in centers:
+        svg.add(Elements3D.sphere, center=(*center, 1), radius=15)
+    svg.add(Elements3D.volume, shape=(64, 128, 128), model_matrix=np.diag([1.0, 1.0, 1.0, 1.0]))
+    matrices = [projection(yaw) for yaw in np.linspace(0, np.pi, frames)]
+
+    def render():
+        return ''.join(svg.render(P=P) for P in matrices)
+    return render
+
+
+def scene_landmarks_3d(frames=5, n=50000):
+    """Labeled 3D landmarks drawn with the batch functions `Elements3D.points` and `Elements3D.texts` per frame."""
+    rng = np.random.default_rng(4)
+    landmarks = rng.uniform(-100, 100, size=(n, 3))
+    labels = [f'L{i}' for i in range(n)]
+    svg = Composer((800, 600))
+    svg.add(Elements3D.points, Xs=landmarks, r=2)
+    svg.add(Elements3D.texts, Xs=landmarks[::10], labels=labels[::10], font_size=6)
+    matrices = [projection(yaw) for yaw in np.linspace(0, np.pi, frames)]
+
+    def render():
+        return ''.join(svg.render(P=P) for P in matrices)
+    return render
+
+
+def scene_conics(n=20000):
+    """Ellipses from conic matrices, each requiring an eigen decomposition."""
+    rng = np.random.default_rng(3)
+    params = rng.uniform([0, 0, 5, 5, 0], [1000, 1000, 50, 50, np.pi], size=(n, 5))
+    matrices = []
+    for x, y, a, b, angle in params:
+        c, s = np.cos(angle), np.sin(angle)
+        T = np.array([[c, -s, x], [s, c, y], [0, 0, 1]])
+        Ti = np.linalg.inv(T)
+        matrices.append(Ti.T @ np.diag([1 / a**2, 1 / b**2, -1]) @ Ti)
+    svg = Composer((1000, 1000))
+    for C in matrices:
+        svg.add(Elements.conic, C=C, stroke='green', fill='none')
+    return lambda: svg.render()
+
+
+def scene_image_4k(cached=False):
+    """A 4K background image embedded as base64 via `image()`, encoded on every render unless `cached`."""
+    from PIL import Image
+    y, x = np.mgrid[0:2160, 0:3840]
+    rgb = np.stack([x * 255 // 3839, y * 255 // 2159, (x + y) % 256], axis=-1).astype(np.uint8)
+    svg = Composer(Image.fromarray(rgb))
+    svg.add(Elements.circle, cx=1920, cy=1080, r=100, stroke='red')
+
+    def render():
+        if not cached:
+            image_cache.clear()
+        return svg.render()
+    return render
+
+
+def scene_image_4k_cached():
+    """The 4K background image of `scene_image_4k()` taken from the image cache, i.e. only hashed."""
+    return scene_image_4k(cached=True)
+
+
+SCENES = {
+    'circles': scene_circles,
+    'nested_groups': scene_nested_groups,
+    'arrows': scene_arrows,
+    'spheres_3d': scene_spheres_3d,
+    'landmarks_3d': scene_landmarks_3d,
+    'conics': scene_conics,
+    'image_4k': scene_image_4k,
+    'image_4k_cached': scene_image_4k_cached,
+}
+
+
+def measure(render, repeat=3):
+    """Best wall time over `repeat` renders, the traced peak memory of one render and the output size."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = render()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'time_s': min(times), 'peak_bytes': peak, 'output_bytes': len(output.encode('utf-8'))}
+
+
+def compare(results, baseline, tolerance):
+    """Print the ratios against a stored baseline and return the names of regressed scenes."""
+    regressions = []
+    print(f"\n{'scene':<16} {'time':>8} {'peak':>8} {'bytes':>8}   (current / baseline)")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f'{name:<16} {"(not in baseline)":>26}')
+            continue
+        ratios = [result[key] / max(baseline[name][key], 1e-12) for key in ('time_s', 'peak_bytes', 'output_bytes')]
+        regressed = any(ratio > 1 + tolerance for ratio in ratios)
+        if regressed:
+            regressions.append(name)
+        print(f'{name:<16} ' + ' '.join(f'{ratio:>7.2f}x' for ratio in ratios) + ('   REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('scenes', nargs='*', metavar='scene', help=f"scenes to run (default: all of {', '.join(SCENES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='timed repetitions per scene')
+    parser.add_argument('--save', metavar='JSON', help='store the results in this file')
+    parser.add_argument('--baseline', metavar='JSON', help='compare against results stored with --save')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative slack before reporting a regression')
+    args = parser.parse_args(argv)
+    unknown = set(args.scenes) - set(SCENES)
+    if unknown:
+        parser.error(f"unknown scene(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    print(f"{'scene':<16} {'time':>10} {'peak memory':>14} {'output':>14}")
+    for name in args.scenes or SCENES:
+        result = measure(SCENES[name](), repeat=args.repeat)
+        results[name] = result
+        print(f"{name:<16} {result['time_s'] * 1e3:>7.1f} ms {result['peak_bytes'] / 2**20:>10.2f} MiB "
+              f"{result['output_bytes'] / 2**10:>10.1f} KiB")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__, 'results': results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Axis-aligned bounding boxes of svg elements, used for viewport culling.
+
+Created for svg_snip, see Composer.py
+
+Shape functions may provide a `bbox` attribute: a function taking the same kwargs as the shape
+function and returning `(xmin, ymin, xmax, ymax)` in the coordinates the element is placed in,
+i.e. before its own `transform` attribute is applied, or None if the bounds are not known.
+Functions without `bbox` (e.g. text) are never culled.
+
+Usage:
+    from svg_snip.Bounds import bounds
+    bounds(circle, dict(cx=10, cy=10, r=2, transform='translate(5)'))  # (12.5, 7.5, 17.5, 12.5)
+"""
+
+import re
+import math
+
+import numpy as np
+
+
+# Bounds of elements which draw nothing, e.g. comments. Neutral for `union()`.
+EMPTY = (math.inf, math.inf, -math.inf, -math.inf)
+
+_TRANSFORM = re.compile(r'\s*(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)\s*,?')
+_NUMBER_SEPARATOR = re.compile(r'[\s,]+')
+
+
+def is_empty(box) -> bool:
+    return box[0] > box[2] or box[1] > box[3]
+
+
+def union(boxes):
+    """Smallest box containing all `boxes`, or None if any of them is None."""
+    xmin, ymin, xmax, ymax = EMPTY
+    for box in boxes:
+        if box is None:
+            return None
+        xmin, ymin = min(xmin, box[0]), min(ymin, box[1])
+        xmax, ymax = max(xmax, box[2]), max(ymax, box[3])
+    return xmin, ymin, xmax, ymax
+
+
+def intersects(a, b) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def contains(outer, inner) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+def _parse_numbers(text):
+    text = text.strip()
+    return [float(v) for v in _NUMBER_SEPARATOR.split(text)] if text else []
+
+
+def parse_transform(transform):
+    """
+    3x3 affine matrix of an svg `transform` attribute.
+
+    Args:
+        transform (str | None): e.g. 'translate(10 20) rotate(45)'.
+
+    Returns:
+        np.ndarray | None: The matrix, or None if the transform could not be parsed.
+    """
+    M = np.eye(3)
+    if not transform:
+        return M
+    position = 0
+    transform = str(transform)
+    while position < len(transform.rstrip()):
+        match = _TRANSFORM.match(transform, position)
+        if match is None:
+            return None
+        name, args = match.groups()
+        try:
+            v = _parse_numbers(args)
+        except ValueError:
+            return None
+        if name == 'matrix' and len(v) == 6:
+            T = np.array([[v[0], v[2], v[4]], [v[1], v[3], v[5]], [0, 0, 1]])
+        elif name == 'translate' and len(v) in (1, 2):
+            T = np.array([[1, 0, v[0]], [0, 1, v[1] if len(v) == 2 else 0], [0, 0, 1]])
+        elif name == 'scale' and len(v) in (1, 2):
+            T = np.diag([v[0], v[-1], 1])
+        elif name == 'rotate' and len(v) in (1, 3):
+            c, s = math.cos(math.radians(v[0])), math.sin(math.radians(v[0]))
+            T = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+            if len(v) == 3:
+                T = np.array([[1, 0, v[1]], [0, 1, v[2]], [0, 0, 1]]) @ T @ np.array([[1, 0, -v[1]], [0, 1, -v[2]], [0, 0, 1]])
+        elif name in ('skewX', 'skewY') and len(v) == 1:
+            t = math.tan(math.radians(v[0]))
+            T = np.array([[1, t, 0], [0, 1, 0], [0, 0, 1]]) if name == 'skewX' else np.array([[1, 0, 0], [t, 1, 0], [0, 0, 1]])
+        else:
+            return None
+        M = M @ T
+        position = match.end()
+    return M
+
+
+def transform_box(M, box):
+    """Bounds of a box mapped by the 3x3 affine matrix M."""
+    if box is None or is_empty(box):
+        return box
+    corners = np.array([[box[0], box[1], 1], [box[2], box[1], 1], [box[0], box[3], 1], [box[2], box[3], 1]])
+    mapped = corners @ M[:2].T
+    xmin, ymin = mapped.min(axis=0).tolist()
+    xmax, ymax = mapped.max(axis=0).tolist()
+    return xmin, ymin, xmax, ymax
+
+
+def bounds(func, kwargs):
+    """
+    Bounds of a shape function (or Group) called with `kwargs`, including its `transform` attribute.
+
+    Returns:
+        tuple[float, float, float, float] | None: (xmin, ymin, xmax, ymax), EMPTY if nothing is drawn,
+            or None if the bounds are not known.
+    """
+    bbox = getattr(func, 'bbox', None)
+    if bbox is None:
+        return None
+    try:
+        box = bbox(**kwargs)
+    except (TypeError, ValueError):
+        return None
+    transform = kwargs.get('transform')
+    if box is None or not transform:
+        return box
+    accepted = getattr(func, 'accepted_kwargs', None)
+    if accepted is not None and 'transform' not in accepted:  # e.g. a <use> with its own transform
+        return box
+    M = parse_transform(transform)
+    return None if M is None else transform_box(M, box)
+
+
+def stroke_margin(kwargs, marker_size=0):
+    """
+    Half the stroke width of an element (stroke_width defaults to 1), or `marker_size` stroke widths
+    if the element has markers.
+    """
+    width = float(kwargs.get('stroke_width', 1) or 0)
+    if marker_size and any(kwargs.get(k) for k in ('marker_start', 'marker_mid', 'marker_end')):
+        return marker_size * max(width, 1)
+    return width / 2
+
+
+def points_box(points, margin=0):
+    """Bounds of a list of points, given as svg `points` string or (N, 2) array, widened by `margin`."""
+    if isinstance(points, str):
+        points = _parse_numbers(points)
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if not len(points):
+        return EMPTY
+    xmin, ymin = points.min(axis=0).tolist()
+    xmax, ymax = points.max(axis=0).tolist()
+    return xmin - margin, ymin - margin, xmax + margin, ymax + margin
@@ -34,8 +34,198 @@ See also: CanvasWithOverlay in Jupyter.py
 """
 
 import io
+import os
+import re
+import gzip
 import html
-import base64
+import time
+import copy
+import inspect
+import weakref
+import functools
+import contextlib
+import contextvars
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .Profiling import profiling, _active_profile
+from .Images import array_digest, display_size, image_cache
+from .Bounds import EMPTY, bounds, contains, intersects, is_empty, parse_transform, transform_box, union
+
+
+# References to definitions in svg code, i.e. url(#id) or href="#id"
+_REFERENCE = re.compile(r'''(?:url\(\s*['"]?#|href=["']#)([^'")\s]+)''')
+
+
+def _referenced_ids(svg_code):
+    """Set of ids referenced by svg code via url(#id) or (xlink:)href="#id"."""
+    if 'url(' not in svg_code and 'href=' not in svg_code:
+        return ()
+    return _REFERENCE.findall(svg_code)
+
+
+def _qualified_name(func):
+    return getattr(func, '__module__', None), getattr(func, '__qualname__', None)
+
+
+NumberFormat = namedtuple('NumberFormat', ['precision', 'minify', 'format'])
+NumberFormat.__doc__ = """
+Formatting of numbers in svg code: digits after the decimal point, whether to strip redundant
+zeros, and the resulting format function (value -> str).
+"""
+
+
+def _strip_zeros(text):
+    """Shortest notation of a formatted decimal number, e.g. '-0.50' -> '-.5' and '2.00' -> '2'."""
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text.startswith('0.'):
+        text = text[1:]
+    elif text.startswith('-0.'):
+        text = '-' + text[2:]
+    return '0' if text in ('', '-0', '-') else text
+
+
+@functools.lru_cache(maxsize=None)
+def _make_number_format(precision, minify):
+    spec = f'.{precision}f'
+    if minify:
+        return NumberFormat(precision, minify, lambda value: _strip_zeros(format(value, spec)))
+    return NumberFormat(precision, minify, ('{:' + spec + '}').format)
+
+
+_number_format = contextvars.ContextVar('svg_snip_number_format', default=_make_number_format(2, False))
+
+
+def get_number_format() -> NumberFormat:
+    """Number format of the current rendering pass, see `number_format()`."""
+    return _number_format.get()
+
+
+def format_number(value, extra_digits=0) -> str:
+    """
+    Format a number for svg code with the precision of the current rendering pass.
+
+    Args:
+        value (float): The number.
+        extra_digits (int): Additional digits, e.g. for angles in degrees. Defaults to 0.
+    """
+    current = _number_format.get()
+    if extra_digits:
+        return _make_number_format(current.precision + extra_digits, current.minify).format(value)
+    return current.format(value)
+
+
+# Redundant zeros in numbers formatted with a fixed number of digits, see `_strip_zeros()`
+_TRAILING_ZEROS = re.compile(r'(\.\d*?)0+(?=[ ,]|$)')
+_TRAILING_POINT = re.compile(r'\.(?=[ ,]|$)')
+_LEADING_ZERO = re.compile(r'(^|[ ,-])0\.')
+_NEGATIVE_ZERO = re.compile(r'(^|[ ,])-0(?=[ ,]|$)')
+
+
+def format_points(points) -> str:
+    """
+    Format vertices as the value of a `points` attribute with the precision of the current rendering pass.
+
+    All coordinates are formatted in a single pass, e.g. [[0, 1.5], [2, 3]] -> '0.00,1.50 2.00,3.00'.
+
+    Args:
+        points (np.ndarray): (N, 2) array, or anything that can be reshaped to it.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    current = _number_format.get()
+    spec = f'%.{current.precision}f'
+    text = ' '.join([f'{spec},{spec}'] * len(points)) % tuple(points.ravel().tolist())
+    if current.minify:
+        if current.precision > 0:
+            text = _LEADING_ZERO.sub(r'\1.', _TRAILING_POINT.sub('', _TRAILING_ZEROS.sub(r'\1', text)))
+        text = _NEGATIVE_ZERO.sub(r'\g<1>0', text)
+    return text
+
+
+@contextlib.contextmanager
+def number_format(precision=None, minify=None):
+    """
+    Context manager setting the formatting of numbers by all shape functions.
+
+    Args:
+        precision (int | None): Digits after the decimal point (2 by default). None keeps the current value.
+        minify (bool | None): Strip trailing zeros and leading zeros of fractions. None keeps the current value.
+
+    Example:
+        with number_format(precision=1, minify=True):
+            print(circle(cx=1.25, cy=0, r=10))  # <circle cx="1.2" cy="0" r="10" />
+    """
+    current = _number_format.get()
+    token = _number_format.set(_make_number_format(
+        current.precision if precision is None else precision,
+        current.minify if minify is None else minify))
+    try:
+        yield
+    finally:
+        _number_format.reset(token)
+
+
+# Numbers in path data and point lists
+_PATH_TOKEN = re.compile(r'[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+def minify_path_data(data) -> str:
+    """
+    Shorten path data (or a list of points) by formatting all numbers with the current number
+    format and removing separators which are not needed, e.g. 'M 10.00,-5.50 L 3.00 4.00' -> 'M10-5.5L3 4'.
+    """
+    fmt = _number_format.get().format
+    result = []
+    previous = ''
+    for token in _PATH_TOKEN.findall(data):
+        if token.isalpha():
+            result.append(token)
+            previous = token
+            continue
+        token = fmt(float(token))
+        if previous and not previous.isalpha() and token[0] != '-' and not (token[0] == '.' and '.' in previous):
+            result.append(' ')
+        result.append(token)
+        previous = token
+    return ''.join(result)
+
+
+_MARKUP_TOKEN = re.compile(r'<!\[CDATA\[.*?\]\]>|<!--.*?-->|<[^>]*>|[^<]+', re.DOTALL)
+_TEXT_TAG = re.compile(r'<(/?)text[\s/>]')
+
+
+def _compact_markup(svg_code, minify=False):
+    """
+    Remove the whitespace between elements (line breaks, indentation) from svg code.
+
+    Whitespace inside tags is collapsed; character data is kept as is, and inside <text>
+    elements even whitespace-only runs are kept, since they render. If `minify` is True,
+    the spaces before the end of a tag are dropped as well.
+    """
+    result = []
+    text_depth = 0
+    for token in _MARKUP_TOKEN.findall(svg_code):
+        if token.startswith('<!'):
+            result.append(token)
+        elif token.startswith('<'):
+            token = ' '.join(token.split())
+            if minify:
+                token = token.replace(' />', '/>').replace('" >', '">')
+            match = _TEXT_TAG.match(token)
+            if match and not token.endswith('/>'):
+                text_depth += -1 if match.group(1) else 1
+            result.append(token)
+        elif text_depth > 0 or token.strip():
+            result.append(token)
+    return ''.join(result)
+
+
+def _minify_markup(svg_code):
+    """Remove redundant whitespace from svg code, see `_compact_markup()`."""
+    return _compact_markup(svg_code, minify=True)
 
 
 def _try_import_pil_image():
@@ -57,6 +247,311 @@ def _try_import_ipython_display():
     return display, HTML
 
 
+def _stream_writer(stream):
+    """Return a function writing str chunks to a text or binary file-like object."""
+    if isinstance(stream, io.TextIOBase):
+        return stream.write
+    mode = getattr(stream, 'mode', '')
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or (isinstance(mode, str) and 'b' in mode):
+        return lambda chunk: stream.write(chunk.encode('utf-8'))
+    return stream.write
+
+
+def _fingerprint(value):
+    """
+    Hashable summary of the content of a value, used as a key for cached renderings.
+
+    Containers and numpy arrays are summarized by content (arrays by a hash of their data), so
+    that in-place modifications produce a different fingerprint. Groups are summarized by their children, and objects with a
+    `fingerprint()` method (e.g. `Elements.Path`) by its result.
+    """
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    if isinstance(value, dict):
+        return ('dict', tuple((k, _fingerprint(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_fingerprint(v) for v in value))
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return ('ndarray', value.shape, _fingerprint(value.tolist()))
+        return ('ndarray', array_digest(value))  # a digest instead of a copy of the data
+    if isinstance(value, Group):
+        return ('Group', id(value), _fingerprint(value.children))
+    if callable(getattr(value, 'fingerprint', None)):
+        return ('fingerprint', value.fingerprint())
+    try:
+        hash(value)
+    except TypeError:
+        return ('id', id(value))
+    return value
+
+
+_signature_kwargs = weakref.WeakKeyDictionary()  # function -> `_accepted_kwargs()` by its signature
+
+
+def _accepted_kwargs(func):
+    """
+    Names of the keyword arguments a shape function depends on, or None if it may depend on any.
+
+    Functions taking **kwargs can declare the keyword arguments they actually use as a set in
+    their `accepted_kwargs` attribute (see also `Elements.define_svg_element`).
+    """
+    names = getattr(func, 'accepted_kwargs', None)
+    if names is not None:
+        return frozenset(names)
+    try:
+        return _signature_kwargs[func]
+    except KeyError:
+        pass
+    except TypeError:  # neither hashable nor weakly referenceable, e.g. a builtin
+        return _signature_names(func)
+    names = _signature_names(func)
+    try:
+        _signature_kwargs[func] = names
+    except TypeError:
+        pass
+    return names
+
+
+def _signature_names(func):
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters):
+        return None
+    return frozenset(p.name for p in parameters)
+
+
+class _Fragments:
+    """
+    Rendered output of the individual children of a Composer, kept from one pass to the next.
+
+    A child is dirty, and is evaluated again, if its kwargs have changed (also in place), or if
+    any of the override kwargs it depends on has changed. All other children reuse their lines.
+    Only the entries used during the latest pass are kept.
+    """
+
+    def __init__(self):
+        self.previous = {}
+        self.current = {}
+
+    def begin_pass(self):
+        self.previous, self.current = self.current, {}
+
+    def clear(self):
+        self.previous.clear()
+        self.current.clear()
+
+    @staticmethod
+    def key(func, child_kwargs, other_kwargs, depth, pretty, viewport=None):
+        try:
+            accepted = _accepted_kwargs(func)
+        except TypeError:  # unhashable callable
+            accepted = None
+        if accepted is not None:
+            other_kwargs = {k: v for k, v in other_kwargs.items() if k in accepted}
+        return (depth, pretty, _number_format.get()[:2], viewport, _fingerprint(func), _fingerprint(child_kwargs),
+                _fingerprint(other_kwargs))
+
+    def reuse(self, child, key):
+        entry = self.previous.get(id(child)) or self.current.get(id(child))
+        if entry is None or entry[0] is not child or entry[1] != key:
+            return None
+        self.current[id(child)] = entry
+        return entry[2], entry[3]
+
+    def store(self, child, key, lines, funcs):
+        self.current[id(child)] = (child, key, lines, funcs)
+
+
+_instances = contextvars.ContextVar('svg_snip_instances', default=None)
+
+
+def _translation(func, kwargs):
+    """
+    Position (x, y) of a shape function declaring its position kwargs in `translation_kwargs`,
+    or None if it has none or they are not plain numbers. See `_Instances`.
+    """
+    names = getattr(func, 'translation_kwargs', None)
+    if not names:
+        return None
+    position = tuple(kwargs.get(name, 0) for name in names)
+    if not all(isinstance(value, (int, float, np.number)) and not isinstance(value, bool) for value in position):
+        return None
+    return position
+
+
+class _Instances:
+    """
+    Repeated content of a rendering, emitted once in <defs> and referenced by <use> elements.
+
+    Instances are groups with identical children and kwargs (differing only by the attributes of
+    their <g> element, e.g. the transform), and shape functions called with identical kwargs except
+    for `transform` and their position. The position kwargs of a shape function are declared by its
+    `translation_kwargs` attribute, e.g. ('cx', 'cy') for circles, and replaced by a translation of
+    the <use> element. Shape functions without it (e.g. lines or polygons) are only instanced if
+    they differ by `transform` alone. Content is only hoisted into <defs> if that makes the output
+    smaller. Instance ids are numbered in the order the content first occurs in the scene.
+
+    Attributes:
+        ids (dict): id of the instance by id of the child tuple, for all children replaced by <use>.
+        defs (dict): (svg code, used definitions) by id of the instance.
+        token (frozenset): ids of all instances, part of the keys of cached renderings.
+    """
+
+    def __init__(self, composer, pretty, **override_kwargs):
+        self._keys = {}  # key of the content by id of the child tuple
+        self._children = []  # keep the children alive, since they are identified by id()
+        self._candidates = {}  # [count, func, kwargs] by key of the content
+        _, other_kwargs = composer._split_call_kwargs(override_kwargs)
+        self._collect(composer, other_kwargs)
+
+        # Instance ids follow the order of the scene, so that they are the same in every rendering (and process)
+        repeated = [key for key, entry in self._candidates.items() if key is not None and entry[0] > 1]
+        planned = {key: f'instance-{number}' for number, key in enumerate(repeated)}
+        self.ids, self.defs = {}, {}
+
+        # Keep the instances which make the output smaller...
+        kept = {}
+        for key, instance_id in planned.items():
+            count, func, kwargs = self._candidates[key]
+            content = self._content(composer, instance_id, func, kwargs, pretty, set())
+            use_size = len(f'<use href="#{instance_id}" transform=""/>') + 20
+            if count * (len(content) - use_size) > len(content):
+                kept[key] = instance_id
+        self.ids = {child_id: kept[key] for child_id, key in self._keys.items() if key in kept}
+
+        # ...and render them again, referencing nested instances
+        self.token = frozenset(kept.values())
+        token = _instances.set(self)
+        try:
+            for key, instance_id in kept.items():
+                _, func, kwargs = self._candidates[key]
+                used_functions = set()
+                content = self._content(composer, instance_id, func, kwargs, pretty, used_functions)
+                self.defs[instance_id] = (content, used_functions)
+        finally:
+            _instances.reset(token)
+
+    @staticmethod
+    def _content(composer, instance_id, func, kwargs, pretty, used_functions):
+        if isinstance(func, Group):
+            lines = list(func._iter_lines(composer, used_functions, 0, pretty, None, None, **kwargs))
+            lines[0] = f'<g id="{instance_id}">'
+        else:
+            lines = [f'<g id="{instance_id}">',
+                     *Group._evaluate_child(func, kwargs, {}, composer, used_functions, 1, pretty, None),
+                     '</g>']
+        return ('\n' if pretty else '').join(lines)
+
+    def _collect(self, group, other_kwargs):
+        """Count the occurrences of the content of all children, recursively."""
+        for child in group.children:
+            func, child_kwargs = child
+            kwargs = {**child_kwargs, **other_kwargs}
+            if isinstance(func, Group):
+                _, inner_kwargs = func._split_call_kwargs(kwargs)
+                key = ('group', _fingerprint(func.children), _fingerprint(inner_kwargs))
+                first = key not in self._candidates
+                self._register(child, key, func, inner_kwargs)
+                if first:
+                    self._collect(func, inner_kwargs)
+                continue
+            try:
+                accepted = _accepted_kwargs(func)
+            except TypeError:  # unhashable callable
+                continue
+            translation = _translation(func, kwargs)
+            if accepted is None or ('transform' not in accepted and translation is None):
+                continue
+            static = {k: v for k, v in kwargs.items() if k in accepted and k != 'transform'}
+            if translation is not None:
+                static.update(dict.fromkeys(func.translation_kwargs, 0))
+            self._register(child, ('shape', func, _fingerprint(static)), func, static)
+
+    def _register(self, child, key, func, kwargs):
+        self._children.append(child)
+        if self._keys.get(id(child), key) != key:
+            key = None  # rendered with different kwargs in different places
+        self._keys[id(child)] = key
+        entry = self._candidates.get(key)
+        if entry is None:
+            self._candidates[key] = [1, func, kwargs]
+        else:
+            entry[0] += 1
+
+    def use(self, child, other_kwargs, prefix, used_functions):
+        """The <use> element replacing the child, or None if it is not an instance."""
+        instance_id = self.ids.get(id(child))
+        if instance_id is None:
+            return None
+        func, child_kwargs = child
+        kwargs = {**child_kwargs, **other_kwargs}
+        if isinstance(func, Group):
+            attributes, _ = func._split_call_kwargs(kwargs)
+        else:
+            transforms = []
+            if kwargs.get('transform') and 'transform' in _accepted_kwargs(func):
+                transforms.append(kwargs['transform'])
+            translation = _translation(func, kwargs)
+            if translation is not None:
+                transforms.append(f'translate({format_number(translation[0])} {format_number(translation[1])})')
+            attributes = {'transform': ' '.join(transforms)} if transforms else {}
+        used_functions.add(instance_id)
+        return prefix + f'<use href="#{instance_id}"' + ''.join(f' {k}="{v}"' for k, v in attributes.items()) + '/>'
+
+    def definitions(self, used_functions):
+        """svg code of all used instances by id, adding the definitions they use to `used_functions`."""
+        pending = [instance_id for instance_id in self.defs if instance_id in used_functions]
+        definitions = {}
+        while pending:
+            instance_id = pending.pop(0)
+            if instance_id in definitions:
+                continue
+            content, used = self.defs[instance_id]
+            definitions[instance_id] = content
+            used_functions.update(used)
+            pending.extend(other for other in used if other in self.defs)
+        return definitions
+
+
+def _render_chunk(children, composer, depth, pretty, other_kwargs, number_format_args=(2, False)):
+    """
+    Render a slice of children, e.g. in a worker process, see `Composer.render(workers=...)`.
+
+    Returns:
+        tuple[str, set]: The svg code of the children and the definitions they used.
+    """
+    used_functions = set()
+    lines = []
+    with number_format(*number_format_args):
+        for func, child_kwargs in children:
+            lines.extend(Group._evaluate_child(func, child_kwargs, other_kwargs, composer, used_functions,
+                                               depth, pretty, None))
+    return ('\n' if pretty else '').join(lines), used_functions
+
+
+def gzip_stream(fileobj, compresslevel=9):
+    """
+    Text stream compressing everything written to it incrementally into a binary file-like object.
+
+    Args:
+        fileobj: Binary file-like object receiving the gzip data, e.g. a socket file or `io.BytesIO`.
+            It stays open when the returned stream is closed.
+        compresslevel (int): Compression level 0 to 9. Defaults to 9.
+
+    Returns:
+        io.TextIOWrapper: Stream to be used as a context manager, see also `Composer.render_to()`.
+
+    Example:
+        with gzip_stream(buffer) as stream:
+            svg.render_to(stream)
+    """
+    compressed = gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=compresslevel)
+    return io.TextIOWrapper(compressed, encoding='utf-8')
+
+
 def indent(text: str, n: int = 2) -> str:
     lines = text.split('\n')
     indented_lines = [' ' * n + line for line in lines]
@@ -68,41 +563,127 @@ def comment(text, **kwargs):
     return f"<!-- {text} -->"
 
 
-def image(data, x=0, y=0, width=None, height=None, sparse=0, **kwargs) -> str:
+comment.accepted_kwargs = {'text'}
+comment.bbox = lambda **kwargs: EMPTY
+
+
+def _displayed_image(data, width=None, height=None, downsample=None, pyramid=False, composer=None, **kwargs):
+    """The PIL image to embed for `image(downsample=...)`, and its width and height in user units."""
+    if width is None or height is None:
+        width, height = (data.width if width is None else width), (data.height if height is None else height)
+    if downsample:
+        size = display_size(data.size, width, height, getattr(composer, 'scale', 1) or 1,
+                            1.0 if downsample is True else downsample)
+        data = image_cache.downsampled(data, size, pyramid)
+    return data, width, height
+
+
+def image(data, x=0, y=0, width=None, height=None, sparse=0, image_format=None, quality=85, time_budget=0.25,
+          downsample=None, pyramid=False, colormap=None, vmin=None, vmax=None, **kwargs) -> str:
     """
     Generate SVG code for a base-64 encoded image
 
     Args:
-        data: PIL image or base64 encoded image as ascii
+        data: PIL image, NumPy array (grayscale, RGB or RGBA, see `svg_snip.Images.array_pixels`)
+            or base64 encoded image as ascii
         x, y: position
         width, height: (optional) size
         sparse: number of colors for PNG compression if >0
+        image_format: (optional) 'jpeg', 'png', 'webp' or 'auto' for the smallest of these,
+            see `svg_snip.Images.encode_image`. Selected by `sparse` by default.
+        quality, time_budget: (optional) JPEG/WebP quality and time limit of 'auto'
+        downsample: (optional) True to embed a PIL image with only as many pixels as it is displayed
+            with (i.e. `width`/`height` times `Composer.scale`), or a number of pixels per displayed
+            pixel, e.g. 2 for HiDPI displays
+        pyramid: (optional) If True, `downsample` uses the closest level of an image pyramid, so that
+            zooming reuses the encoded levels
+        colormap, vmin, vmax: (optional) colormap and window of NumPy arrays, e.g. 'gray' or 'viridis'
+
+    Encoded images are cached by content, see `svg_snip.Images.image_cache`. NumPy arrays are
+    encoded as PNG without Pillow, unless `image_format` asks for another format.
     """
     # Default format to png if data is already a base64 string
     img_format = "png"
 
     pil_image_type = _try_import_pil_image()
-    if pil_image_type is not None and isinstance(data, pil_image_type):
-        buffered = io.BytesIO()
-        if sparse is not None and sparse > 0:
-            img_format = "png"
-            if sparse > 1:
-                from PIL import Image as PILImageModule
-                data = data.convert("P", palette=PILImageModule.ADAPTIVE, colors=sparse)
-            data.save(buffered, format="PNG", optimize=True)
-        else:
-            img_format = "jpeg"
-            data.save(buffered, format="JPEG")
-        data = base64.b64encode(buffered.getvalue()).decode()
+    if isinstance(data, np.ndarray):
+        img_format, data = image_cache.encode_array(data, colormap, vmin, vmax, image_format, quality, time_budget)
+    elif pil_image_type is not None and isinstance(data, pil_image_type):
+        if downsample:
+            data, width, height = _displayed_image(data, width, height, downsample, pyramid, **kwargs)
+        img_format, data = image_cache.encode(data, sparse, image_format, quality, time_budget)
 
     attributes = ""
     if height is not None:
-        attributes += f'height="{height:.2f}px" '
+        attributes += f'height="{format_number(height)}px" '
     if width is not None:
-        attributes += f'width="{width:.2f}px" '
+        attributes += f'width="{format_number(width)}px" '
 
     # Dynamically inject the correct image format into the Data URI
-    return f'<image x="{x:.2f}px" y="{y:.2f}px" {attributes} href="data:image/{img_format};base64,{data}" />'
+    return f'<image x="{format_number(x)}px" y="{format_number(y)}px" {attributes} href="data:image/{img_format};base64,{data}" />'
+
+
+image.accepted_kwargs = {'data', 'x', 'y', 'width', 'height', 'sparse', 'image_format', 'quality', 'time_budget',
+                         'downsample', 'pyramid', 'colormap', 'vmin', 'vmax'}
+
+
+def _image_bbox(data, x=0, y=0, width=None, height=None, **kwargs):
+    if width is None or height is None:
+        if isinstance(data, np.ndarray):
+            height, width = data.shape[:2]
+        elif not hasattr(data, 'size') or isinstance(data, str):
+            return None
+        else:
+            width, height = data.size
+    return x, y, x + width, y + height
+
+
+image.bbox = _image_bbox
+
+
+def _image_tile(data, box, digest, x=0, y=0, width=None, height=None, **kwargs) -> str:
+    """The region `box` (in pixels) of the PIL image `data` with the given digest, see `tiled_image()`."""
+    tile = image_cache.derived(data, ('crop', box), lambda source: source.crop(box), digest)
+    return image(tile, x, y, width, height, **kwargs)
+
+
+_image_tile.accepted_kwargs = image.accepted_kwargs | {'box', 'digest'}
+_image_tile.bbox = _image_bbox
+
+
+def tiled_image(data, x=0, y=0, width=None, height=None, tile_size=1024, downsample=None, pyramid=False,
+                **kwargs) -> 'Group':
+    """
+    Embed a large PIL image as a grid of tiles, which are cropped and encoded independently by `image()`.
+
+    With `Composer.render(cull=True)`, tiles outside of the viewBox are neither cropped nor encoded.
+    The image is hashed only once per image object, i.e. unlike `image()`, in-place modifications
+    of `data` (e.g. `paste()`) are not detected. Pass a new image or call `image_cache.clear()` instead.
+
+    Args:
+        data: PIL image
+        x, y: position
+        width, height: (optional) size
+        tile_size: width and height of the tiles in pixels of the embedded image
+        downsample, pyramid: see `image()`, applied to the whole image before tiling
+        **kwargs: passed on to `image()`, e.g. `image_format`
+    """
+    image_cache.digest(data, remember=True)
+    source, width, height = _displayed_image(data, width, height, downsample, pyramid, **kwargs)
+    digest = image_cache.digest(source, remember=True)
+    image_kwargs = {k: v for k, v in kwargs.items() if k in image.accepted_kwargs}
+    sx, sy = width / source.width, height / source.height
+    group = Group()
+    for top in range(0, source.height, tile_size):
+        for left in range(0, source.width, tile_size):
+            box = (left, top, min(left + tile_size, source.width), min(top + tile_size, source.height))
+            group.add(_image_tile, data=source, box=box, digest=digest, x=x + left * sx, y=y + top * sy,
+                      width=(box[2] - box[0]) * sx, height=(box[3] - box[1]) * sy, **image_kwargs)
+    return group
+
+
+tiled_image.accepted_kwargs = image.accepted_kwargs | {'tile_size'}
+tiled_image.bbox = _image_bbox
 
 
 class Group:
@@ -115,6 +696,10 @@ class Group:
 
     Args:
         children (list[tuple[ShapeFunc, dict]], optional): Initial children to add to the group.
+        cache_size (int, optional): Number of renderings of this group to keep in memory (LRU).
+            A cached rendering is reused as long as the children, their kwargs and the kwargs
+            reaching the group during rendering (e.g. `P`) are unchanged. Children must be
+            functions of their kwargs only. Defaults to 0 (no caching).
         kwargs (dict[str, str], optional): Default attributes for the <g> element (e.g., transform, style).
 
     Usage example:
@@ -133,8 +718,12 @@ class Group:
         "font-family", "font-size", "font-weight"
     }
 
-    def __init__(self, comment_str : str | None = None, children=[], **kwargs):
+    def __init__(self, comment_str : str | None = None, children=[], cache_size=0, **kwargs):
         self.children = []
+        self._observers = []
+        self.comment_str = comment_str
+        self.cache_size = cache_size
+        self._render_cache = OrderedDict()
         if comment_str is not None:
             self.add(comment, text=comment_str)
         self.children += children
@@ -143,12 +732,69 @@ class Group:
 
     def add(self, func, **kwargs):
         self.children.append((func, kwargs))
+        self._render_cache.clear()  # the fragments of incremental rendering stay valid, see `invalidate()`
+        for observer in self._observers:
+            observer(self, self.children[-1])
         return self.children[-1]
 
-    def __call__(self, *, composer=None, **call_kwargs):
-        is_composer = isinstance(self, Composer)
+    def add_observer(self, observer):
+        """Call `observer(group, child)` whenever a child is added, e.g. by `svg_snip.Spatial.SpatialIndex`."""
+        self._observers.append(observer)
+
+    def remove_observer(self, observer):
+        self._observers.remove(observer)
+
+    def __getstate__(self):
+        # Observers are not copied along, e.g. to worker processes
+        state = self.__dict__.copy()
+        state['_observers'] = []
+        return state
+
+    def invalidate(self):
+        """Discard all cached renderings of this group."""
+        self._render_cache.clear()
+
+    def bbox(self, **call_kwargs):
+        """
+        Bounds of all children in the coordinates of this group, i.e. before its `transform`.
+
+        Returns:
+            tuple[float, float, float, float] | None: (xmin, ymin, xmax, ymax), or None if the bounds
+                of any child are not known, see `svg_snip.Bounds`.
+        """
+        _, other_kwargs = self._split_call_kwargs(call_kwargs)
+        return union(bounds(func, {**child_kwargs, **other_kwargs}) for func, child_kwargs in self.children)
+
+    @staticmethod
+    def _cull(func, kwargs, viewport):
+        """
+        Whether a child is visible at all, and the viewport to cull its own children against.
+
+        Args:
+            func: Shape function or Group.
+            kwargs (dict): The kwargs of the child, including the override kwargs.
+            viewport (tuple): (xmin, ymin, xmax, ymax) in the coordinates the child is placed in.
 
-        group_dict = {} if is_composer else {
+        Returns:
+            tuple[bool, tuple | None]: False if the child can be dropped, and the viewport in the
+                coordinates of its children (None if they need not or cannot be culled).
+        """
+        box = bounds(func, kwargs)
+        if box is not None and not is_empty(box):
+            if not intersects(box, viewport):
+                return False, None
+            if contains(viewport, box):
+                return True, None
+        if not isinstance(func, Group):
+            return True, viewport
+        M = parse_transform(kwargs.get('transform'))
+        if M is None:
+            return True, None
+        return True, transform_box(np.linalg.inv(M), viewport)
+
+    def _split_call_kwargs(self, call_kwargs):
+        """Separate the attributes of the <g> element from the kwargs passed on to the children."""
+        group_dict = {} if isinstance(self, Composer) else {
             k: v for k, v in call_kwargs.items()
             if k in self.VALID_GROUP_ATTRIBUTES
         }
@@ -156,51 +802,298 @@ class Group:
             k: v for k, v in call_kwargs.items()
             if k not in group_dict
         }
-        group_attribs = ''.join(f' {k}="{v}"' for k, v in group_dict.items())
+        return group_dict, other_kwargs
 
-        content = []
-        used_functions = set()
+    @staticmethod
+    def _call_child(func, merged_kwargs):
+        """Call a shape function and report its arguments if it fails."""
+        try:
+            return func(**merged_kwargs)
+        except Exception:
+            formatted_args = ",\n".join(
+                f"    {k}={v!r}" for k, v in merged_kwargs.items()
+            )
+            func_name = getattr(func, "__name__", str(type(func)) + '<' + str(func) + '>')
+            print(
+                f"Error during evaluation of\n"
+                f"  {func_name}(\n"
+                f"{formatted_args}\n"
+                f"  )"
+            )
+            raise
+
+    def _iter_lines(self, composer, used_functions, depth=0, pretty=True, fragments=None, viewport=None,
+                    **call_kwargs):
+        """
+        Yield the svg code of this group one line at a time, see `_evaluate_lines()`.
+
+        If `cache_size` is set, the lines and used definitions are memoized, keyed by the content
+        of the children and of `call_kwargs`.
+        """
+        lines = self._cached_lines(composer, used_functions, depth, pretty, fragments, viewport, **call_kwargs)
+        profile = _active_profile.get()
+        if profile is None:
+            yield from lines
+        else:
+            yield from profile.timed_lines(self, lines)
+
+    def _cached_lines(self, composer, used_functions, depth=0, pretty=True, fragments=None, viewport=None,
+                      **call_kwargs):
+        if not self.cache_size:
+            yield from self._evaluate_lines(composer, used_functions, depth, pretty, fragments, viewport,
+                                            **call_kwargs)
+            return
+
+        instances = _instances.get()
+        key = (depth, pretty, _number_format.get()[:2], viewport, instances and instances.token,
+               _fingerprint(self.children), _fingerprint(call_kwargs))
+        cached = self._render_cache.get(key)
+        if cached is None:
+            lines, funcs = [], set()
+            for line in self._evaluate_lines(composer, funcs, depth, pretty, fragments, viewport, **call_kwargs):
+                lines.append(line)
+                yield line
+            self._render_cache[key] = (lines, funcs)
+            while len(self._render_cache) > self.cache_size:
+                self._render_cache.popitem(last=False)
+        else:
+            self._render_cache.move_to_end(key)
+            lines, funcs = cached
+            yield from lines
+        used_functions.update(funcs)
+
+    def _evaluate_lines(self, composer, used_functions, depth=0, pretty=True, fragments=None, viewport=None,
+                        **call_kwargs):
+        """
+        Evaluate the children and yield the svg code of this group one line at a time.
+
+        Nested groups are evaluated recursively with the depth they are rendered at, so that every
+        line is emitted exactly once, already carrying its final indentation. Joining the lines
+        with newlines (or with nothing if `pretty` is False) yields the svg code of the group.
+
+        Args:
+            composer (Composer | None): The composer of the current rendering pass.
+            used_functions (set): Updated in place with the ids of the definitions referenced by the
+                children (and functions whose definitions are all used, see `declare()`).
+            depth (int): Nesting depth of this group (children are indented by one more level).
+            pretty (bool): If False, no indentation is added at all.
+            fragments (_Fragments | None): Output of the previous pass to be reused where possible.
+            viewport (tuple | None): Visible area (xmin, ymin, xmax, ymax) in the coordinates of the
+                children. Children whose bounds miss it are dropped. None disables culling.
+            **call_kwargs: Attributes of the <g> element and kwargs passed on to the children.
+
+        Yields:
+            str: Lines of svg code (multi-line child results are yielded as a single entry).
+        """
+        is_composer = isinstance(self, Composer)
+        group_dict, other_kwargs = self._split_call_kwargs(call_kwargs)
+        prefix = '  ' * depth if pretty else ''
+
+        if not is_composer:
+            yield self._open_tag(group_dict, prefix)
+
+        instances = _instances.get()
+        child_prefix = '  ' * (depth + 1) if pretty else ''
+        for child in self.children:
+            func, child_kwargs = child
+            child_viewport = None
+            if viewport is not None:
+                visible, child_viewport = self._cull(func, {**child_kwargs, **other_kwargs}, viewport)
+                if not visible:
+                    continue
+            if instances is not None:
+                use = instances.use(child, other_kwargs, child_prefix, used_functions)
+                if use is not None:
+                    yield use
+                    continue
+            if fragments is None or isinstance(func, Group):
+                yield from self._evaluate_child(func, child_kwargs, other_kwargs, composer, used_functions,
+                                                depth + 1, pretty, fragments, child_viewport)
+                continue
+
+            key = fragments.key(func, child_kwargs, other_kwargs, depth + 1, pretty, child_viewport)
+            reused = fragments.reuse(child, key)
+            if reused is None:
+                lines, funcs = [], set()
+                for line in self._evaluate_child(func, child_kwargs, other_kwargs, composer, funcs,
+                                                 depth + 1, pretty, fragments, child_viewport):
+                    lines.append(line)
+                    yield line
+                fragments.store(child, key, lines, funcs)
+            else:
+                lines, funcs = reused
+                yield from lines
+            used_functions.update(funcs)
+
+        if not is_composer:
+            yield f'{prefix}</g>'
+
+    def _compile(self, template, depth=0, **call_kwargs):
+        """Add the lines of this group to a Template, see `Composer.compile()`."""
+        is_composer = isinstance(self, Composer)
+        group_dict, other_kwargs = self._split_call_kwargs(call_kwargs)
+        prefix = '  ' * depth if template.pretty else ''
+
+        if not is_composer:
+            template.parts.append(self._open_tag(group_dict, prefix))
 
         for func, child_kwargs in self.children:
-            merged_kwargs = {**child_kwargs, **other_kwargs, 'composer': composer}
-            try:
-                child_result = func(**merged_kwargs)
-            except Exception:
-                formatted_args = ",\n".join(
-                    f"    {k}={v!r}" for k, v in merged_kwargs.items()
-                )
-                func_name = getattr(func, "__name__", str(type(func)) + '<' + str(func) + '>')
-                print(
-                    f"Error during evaluation of\n"
-                    f"  {func_name}(\n"
-                    f"{formatted_args}\n"
-                    f"  )"
-                )
-                raise
-            while isinstance(child_result, Group):
-                other_kwargs['composer'] = composer
-                child_result = child_result(**other_kwargs)
-            if isinstance(child_result, tuple):
-                child_svg, child_funcs = child_result
-                used_functions.update(child_funcs)
-                content.append(child_svg)
-            else:  # assume it's a string of svg code
-                used_functions.add(func)
-                content.append(child_result)
-
-        content = "\n".join([line for line in content if line.strip()])
-        if is_composer:
-            svg_code = indent(content)
+            if isinstance(func, Group):
+                func._compile(template, depth + 1, **{**child_kwargs, **other_kwargs})
+            elif template.depends_on_params(func):
+                template.parts.append((func, child_kwargs, other_kwargs, depth + 1))
+            else:
+                template.parts.extend(self._evaluate_child(
+                    func, child_kwargs, other_kwargs, template.composer, template.used_functions,
+                    depth + 1, template.pretty, None))
+
+        if not is_composer:
+            template.parts.append(f'{prefix}</g>')
+
+    @staticmethod
+    def _open_tag(group_dict, prefix=''):
+        group_attribs = ''.join(f' {k}="{v}"' for k, v in group_dict.items())
+        return f'{prefix}<g{group_attribs}>'
+
+    @classmethod
+    def _evaluate_child(cls, func, child_kwargs, other_kwargs, composer, used_functions, depth, pretty,
+                        fragments, viewport=None):
+        """Evaluate a single child at the given depth and yield its lines, see `_evaluate_lines()`."""
+        if isinstance(func, Group):
+            yield from func._iter_lines(composer, used_functions, depth, pretty, fragments, viewport,
+                                        **{**child_kwargs, **other_kwargs})
+            return
+
+        profile = _active_profile.get()
+        if profile is None:
+            child_result = cls._call_child(func, {**child_kwargs, **other_kwargs, 'composer': composer})
         else:
-            svg_code = f'<g{group_attribs}>\n{indent(content)}' + '\n</g>'
+            start = time.perf_counter()
+            child_result = cls._call_child(func, {**child_kwargs, **other_kwargs, 'composer': composer})
+            profile.add_call(func, time.perf_counter() - start, child_result)
+        if isinstance(child_result, Group):
+            yield from child_result._iter_lines(composer, used_functions, depth, pretty, fragments, viewport,
+                                                **other_kwargs)
+            return
+        if isinstance(child_result, tuple):
+            child_svg, child_funcs = child_result
+            used_functions.update(child_funcs)
+        else:  # assume it's a string of svg code
+            child_svg = child_result
+            used_functions.update(_referenced_ids(child_svg))
+        if child_svg.strip():
+            if pretty:
+                prefix = '  ' * depth
+                yield prefix + child_svg.replace('\n', '\n' + prefix)
+            elif _number_format.get().minify:
+                yield _minify_markup(child_svg)
+            elif '\n' in child_svg:
+                yield _compact_markup(child_svg)
+            else:
+                yield child_svg
+
+    def __call__(self, *, composer=None, **call_kwargs):
+        used_functions = set()
+        svg_code = '\n'.join(self._iter_lines(composer, used_functions, **call_kwargs))
         return svg_code, used_functions
 
 
     @classmethod
     def declare(cls, func, definitions):
+        """
+        Register SVG definitions (e.g. markers or symbols), which are added to the <defs> block of
+        every rendering referencing their id, via `url(#id)` or `href="#id"`.
+
+        Functions returning `(svg_code, used_functions)` tuples instead of plain svg code may
+        include `func` in the set to request all of its definitions.
+
+        Args:
+            func: The shape function the definitions belong to.
+            definitions (dict[str, str]): svg code of each definition by id.
+
+        A function with the same qualified name declaring the same ids replaces the earlier one,
+        e.g. when a notebook cell is executed again.
+
+        Raises:
+            ValueError: If an id was already declared with a different definition by another function.
+        """
+        for other, other_definitions in list(cls.declared_shapes.items()):
+            if other is func:
+                continue
+            if (_qualified_name(func)[1] is not None and _qualified_name(other) == _qualified_name(func)
+                    and other_definitions.keys() == definitions.keys()):  # e.g. re-definition in a notebook
+                del cls.declared_shapes[other]
+                continue
+            for def_id, definition in definitions.items():
+                if other_definitions.get(def_id, definition) != definition:
+                    raise ValueError(
+                        f"SVG definition id '{def_id}' of {getattr(func, '__name__', repr(func))} was "
+                        f"already declared with a different definition by {getattr(other, '__name__', repr(other))}")
         cls.declared_shapes[func] = definitions
 
 
+class Template:
+    """
+    Composer with pre-rendered static content and slots for the children depending on parameters.
+
+    Created by `Composer.compile()`. Calling the template with the parameters as keyword arguments
+    evaluates only the slots and returns the complete SVG markup as a string.
+
+    Attributes:
+        params (frozenset[str]): Names of the parameters.
+        parts (list[str | tuple]): Pre-rendered svg code and slots (func, child_kwargs, other_kwargs, depth).
+        used_functions (set): Definitions used by the pre-rendered svg code, see `Group.declare()`.
+    """
+
+    def __init__(self, composer, params, pretty=True, extra_defs=None, extra_attrib=''):
+        self.composer = composer
+        self.params = params
+        self.pretty = pretty
+        self.extra_defs = extra_defs
+        self.extra_attrib = extra_attrib
+        self.number_format = get_number_format()
+        if self.number_format.minify:
+            self.pretty = False
+        self.parts = []
+        self.used_functions = set()
+
+    def depends_on_params(self, func) -> bool:
+        try:
+            accepted = _accepted_kwargs(func)
+        except TypeError:  # unhashable callable
+            accepted = None
+        return accepted is None or not accepted.isdisjoint(self.params)
+
+    def finalize(self):
+        """Join consecutive pre-rendered lines into a single part."""
+        separator = '\n' if self.pretty else ''
+        parts = []
+        for part in self.parts:
+            if isinstance(part, str) and parts and isinstance(parts[-1], str):
+                parts[-1] += separator + part
+            else:
+                parts.append(part)
+        self.parts = parts
+
+    def __call__(self, **params) -> str:
+        unknown = set(params) - self.params
+        if unknown:
+            raise TypeError(f"Unknown template parameters: {sorted(unknown)}")
+        used_functions = set(self.used_functions)
+        content = []
+        with number_format(*self.number_format[:2]):
+            for part in self.parts:
+                if isinstance(part, str):
+                    content.append(part)
+                else:
+                    func, child_kwargs, other_kwargs, depth = part
+                    content.extend(Group._evaluate_child(
+                        func, child_kwargs, {**other_kwargs, **params}, self.composer, used_functions,
+                        depth, self.pretty, None))
+            return self.composer._assemble(content, used_functions, self.extra_defs, self.extra_attrib,
+                                           self.pretty)
+
+
 class Composer(Group):
     """
     Composer for generating scalable vector graphics (SVG) as HTML snippets.
@@ -215,16 +1108,33 @@ class Composer(Group):
         widget (IPython.display.HTML or None): Holds the displayed SVG widget in Jupyter.
 
     Args:
-        canvas (tuple[int, int] | PIL.Image.Image | None): Defines canvas size or background image.
-            If a PIL Image is provided, it is embedded as a background image in the SVG.
+        canvas (tuple[int, int] | PIL.Image.Image | np.ndarray | None): Defines canvas size or background image.
+            If a PIL Image (or an image as NumPy array) is provided, it is embedded as a background image in the SVG.
             If a tuple, sets the width and height of the SVG canvas.
             Defaults to (100, 100) if None.
         sparse (int | None): Optional color reduction for embedded PNG images (applies when canvas is an Image).
+        downsample (bool | float | None): Embed the background image with only as many pixels as it is
+            displayed with, see `image()`. `pyramid` selects levels of an image pyramid instead.
+        tile_size (int | None): Embed the background image as tiles of this size, see `tiled_image()`.
 
     Methods:
-        render(debug=False, nested=False, extra_defs=None, extra_attrib='', **override_kwargs) -> str:
+        render(debug=False, nested=False, extra_defs=None, extra_attrib='', pretty=True, incremental=False,
+               workers=None, executor='process', profile=None, cull=False, instancing=False,
+               **override_kwargs) -> str:
             Renders the full SVG markup as a string, optionally including debug info and extra definitions.
-        update(**override_kwargs) -> None:
+        close() -> None:
+            Shuts down the pool of workers kept by `render(workers=...)`.
+        encode_images(workers=None, **override_kwargs) -> int:
+            Encodes all embedded PIL images in a pool of threads ahead of rendering.
+        iter_render(extra_defs=None, extra_attrib='', pretty=True, **override_kwargs) -> Iterator[str]:
+            Renders the SVG markup piece by piece, with the <defs> block at the end.
+        render_to(stream, extra_defs=None, extra_attrib='', pretty=True, **override_kwargs) -> None:
+            Writes the SVG markup to a text or binary file-like object while rendering.
+        save(path, compresslevel=9, **render_kwargs) -> None:
+            Writes the SVG markup to a `.svg` file, or gzip-compressed to a `.svgz` file, while rendering.
+        compile(params, pretty=True, extra_defs=None, extra_attrib='', **override_kwargs) -> Template:
+            Pre-renders all children not depending on `params` into a reusable Template.
+        update(incremental=False, **override_kwargs) -> None:
             Updates the displayed SVG widget in Jupyter with new rendering.
         display(debug=False, **override_kwargs) -> None:
             Displays the SVG inline in Jupyter, creating a new widget if needed.
@@ -238,21 +1148,45 @@ class Composer(Group):
         svg.display()
     """
 
-    def __init__(self, canvas=None, sparse=None):
+    def __init__(self, canvas=None, sparse=None, downsample=None, pyramid=False, tile_size=None):
+        self._fragments = _Fragments()
         super().__init__()
         pil_image_type = _try_import_pil_image()
         if pil_image_type is not None and isinstance(canvas, pil_image_type):
             self.image_size = (canvas.width, canvas.height)
             # Add the background image shape automatically
-            self.add(image, data=canvas, sparse=sparse)
+            if tile_size:
+                self.add(tiled_image, data=canvas, sparse=sparse, downsample=downsample, pyramid=pyramid,
+                         tile_size=tile_size)
+            elif downsample:
+                self.add(image, data=canvas, sparse=sparse, downsample=downsample, pyramid=pyramid)
+            else:
+                self.add(image, data=canvas, sparse=sparse)
+        elif isinstance(canvas, np.ndarray) and canvas.ndim >= 2:
+            self.image_size = (canvas.shape[1], canvas.shape[0])
+            self.add(image, data=canvas)
         elif isinstance(canvas, tuple):
             self.image_size = canvas
         else:
             self.image_size = (100, 100)
         self.scale = 1
         self.widget = None
+        self._pool = None  # ((executor, workers), pool) of `render(workers=...)`, see `close()`
+
+    def __getstate__(self):
+        # The pool of workers stays with the original, e.g. when sent to worker processes
+        state = super().__getstate__()
+        state['_pool'] = None
+        return state
 
-    def render(self, debug=False, nested=False, extra_defs=None, extra_attrib='', **override_kwargs):
+    def invalidate(self):
+        """Discard all cached renderings, including the fragments kept for incremental rendering."""
+        super().invalidate()
+        self._fragments.clear()
+
+    def render(self, debug=False, nested=False, extra_defs=None, extra_attrib='', pretty=True,
+               incremental=False, workers=None, executor='process', precision=None, minify=None,
+               profile=None, cull=False, instancing=False, image_workers=None, **override_kwargs):
         """
         Render the SVG content as a complete SVG markup string.
 
@@ -270,6 +1204,39 @@ class Composer(Group):
                 (e.g., `<defs>` content) to include in the output. Defaults to None.
             extra_attrib (str, optional): Extra attributes to add to the root `<svg>` element,
                 e.g. `'class="my-svg" aria-hidden="true"'`. Defaults to an empty string.
+            pretty (bool, optional): If False, the markup is written without any indentation
+                or line breaks between elements, also within multi-line shape results and
+                definitions. Character data inside <text> is kept as is. Defaults to True.
+            incremental (bool, optional): If True, only the children whose kwargs, or the override
+                kwargs they depend on, have changed since the last incremental rendering are
+                evaluated again. The output of all other children is reused, i.e. shape functions
+                reading state other than their kwargs (globals, closures) are not evaluated again.
+                Defaults to False.
+            workers (int | None, optional): If greater than one, the top-level children (and the
+                children of large top-level groups) are split into chunks, which are evaluated in a
+                pool of this many workers. Ignores `incremental`. Defaults to None.
+            executor (str | concurrent.futures.Executor, optional): 'process' or 'thread' for a
+                pool of `workers`, or an existing executor. The pool is created on first use and kept
+                for later renderings until `close()` is called. Children must be picklable for
+                process pools. Defaults to 'process'.
+            precision (int | None, optional): Digits after the decimal point of all numbers.
+                Defaults to None, i.e. 2 unless set by `number_format()`.
+            minify (bool | None, optional): If True, numbers are written without redundant zeros,
+                path data and point lists are shortened, redundant whitespace is removed and
+                `pretty` is ignored. Defaults to None, i.e. False unless set by `number_format()`.
+            profile (RenderProfile | None, optional): Collects time, calls and bytes per shape function
+                and Group, see `svg_snip.Profiling`. Defaults to None.
+            cull (bool, optional): If True, children and whole groups whose bounds lie outside of the
+                viewBox are dropped. Only shape functions with a `bbox` are culled, see `svg_snip.Bounds`.
+                Ignored with `workers`. Defaults to False.
+            instancing (bool, optional): If True, groups rendered several times with the same content
+                (e.g. with different transforms), and shapes repeated with the same kwargs except for
+                `transform` or their position (see `_Instances`), are written once to <defs> and
+                referenced by <use> elements, if that makes the output smaller. Ignored with `workers`.
+                Defaults to False.
+            image_workers (int | None, optional): If given, the PIL images of all `image()` children
+                are encoded in a pool of this many threads before rendering, see `encode_images()`.
+                Defaults to None.
             **override_kwargs: Arbitrary keyword arguments to override or add to
                 shape function parameters during rendering.
 
@@ -281,42 +1248,346 @@ class Composer(Group):
             svg.add(circle, cx=100, cy=100, r=10)
             print(svg.render(debug=True, extra_attrib='class="icon"'))
         """
-        definitions = extra_defs if isinstance(extra_defs, dict) else {}
+        if image_workers is not None:
+            self.encode_images(image_workers, **override_kwargs)
+        fragments = None
+        if incremental:
+            fragments = self._fragments
+            fragments.begin_pass()
+        used_functions = set()
+        with number_format(precision, minify), \
+                (profiling(profile) if profile is not None else contextlib.nullcontext()):
+            if _number_format.get().minify:
+                pretty = False
+            if workers is not None and workers > 1:
+                content = self._render_parallel(used_functions, workers, executor, pretty, override_kwargs)
+                raw_html = self._assemble(content, used_functions, extra_defs, extra_attrib, pretty)
+            else:
+                token = _instances.set(_Instances(self, pretty, **override_kwargs) if instancing else None)
+                try:
+                    content = list(self._iter_lines(self, used_functions, 0, pretty, fragments,
+                                                    self.viewport if cull else None, **override_kwargs))
+                    raw_html = self._assemble(content, used_functions, extra_defs, extra_attrib, pretty)
+                finally:
+                    _instances.reset(token)
+
+        if debug:
+            return f'<details close><summary>show html</summary><pre>{html.escape(raw_html, quote=True)}</pre></details>\n{raw_html}'
+        else:
+            return raw_html
+
+    def iter_render(self, extra_defs=None, extra_attrib='', pretty=True, precision=None, minify=None,
+                    profile=None, cull=False, instancing=False, image_workers=None, **override_kwargs):
+        """
+        Render the SVG markup chunk by chunk, evaluating the children as the chunks are consumed.
+
+        Unlike `render()`, the complete markup never exists in memory. Since the definitions used
+        by the children are only known once all of them have been evaluated, the `<defs>` block
+        is emitted after the content, right before the closing `</svg>` tag.
+
+        Args:
+            extra_defs, extra_attrib, pretty, precision, minify, profile, cull, instancing, image_workers,
+                **override_kwargs: See `render()`.
+
+        Yields:
+            str: Consecutive pieces of the SVG markup.
+        """
+        if image_workers is not None:
+            self.encode_images(image_workers, **override_kwargs)
+        # The number format only applies while the children are evaluated, not between the chunks
+        context = contextvars.copy_context()
+        current = context.run(_number_format.get)
+        context.run(_number_format.set, _make_number_format(
+            current.precision if precision is None else precision,
+            current.minify if minify is None else minify))
+        if profile is not None:
+            context.run(_active_profile.set, profile)
+        if context.run(_number_format.get).minify:
+            pretty = False
+        separator = '\n' if pretty else ''
+        used_functions = set()
+        context.run(_instances.set,
+                    context.run(_Instances, self, pretty, **override_kwargs) if instancing else None)
+
+        yield self._svg_open_tag(extra_attrib)
+        lines = self._iter_lines(self, used_functions, 0, pretty, None, self.viewport if cull else None,
+                                 **override_kwargs)
+        for line in iter(functools.partial(context.run, next, lines, None), None):
+            yield separator + line
+
+        definitions = context.run(self._definitions, used_functions, extra_defs, pretty)
+        if definitions:
+            yield separator + definitions
+        yield separator + '</svg>'
+
+    def render_to(self, stream, extra_defs=None, extra_attrib='', pretty=True, precision=None, minify=None,
+                  profile=None, cull=False, instancing=False, image_workers=None, **override_kwargs) -> None:
+        """
+        Write the SVG markup to a file-like object as it is being rendered. See also `iter_render()`.
+
+        Args:
+            stream: Text or binary file-like object. Binary streams receive UTF-8.
+            extra_defs, extra_attrib, pretty, precision, minify, profile, cull, instancing, image_workers,
+                **override_kwargs: See `render()`.
+
+        Example:
+            with open('overlay.svg', 'w') as file:
+                svg.render_to(file, P=P)
+        """
+        write = _stream_writer(stream)
+        for chunk in self.iter_render(extra_defs=extra_defs, extra_attrib=extra_attrib, pretty=pretty,
+                                      precision=precision, minify=minify, profile=profile, cull=cull,
+                                      instancing=instancing, image_workers=image_workers, **override_kwargs):
+            write(chunk)
+
+    def save(self, path, compresslevel=9, **render_kwargs) -> None:
+        """
+        Write the SVG markup to a file as it is being rendered, see `render_to()`.
+
+        Files ending in `.svgz` are gzip-compressed incrementally, so that the uncompressed markup
+        never exists in memory. All other files are written as plain SVG (UTF-8).
+
+        Args:
+            path (str | os.PathLike): The file to write.
+            compresslevel (int, optional): Compression level 0 to 9 for `.svgz`. Defaults to 9.
+            **render_kwargs: Passed on to `render_to()`, e.g. `minify=True` or override kwargs.
+        """
+        path = os.fspath(path)
+        if path.lower().endswith('.svgz'):
+            file = gzip.open(path, 'wt', encoding='utf-8', compresslevel=compresslevel)
+        else:
+            file = open(path, 'w', encoding='utf-8')
+        with file:
+            self.render_to(file, **render_kwargs)
+
+    def encode_images(self, workers=None, **override_kwargs) -> int:
+        """
+        Encode the PIL images of all `image()` and `tiled_image()` children (including nested groups)
+        in a pool of threads, so that rendering takes the encoded images from `svg_snip.Images.image_cache`.
 
-        override_kwargs['composer'] = self
-        child_svg, used_functions = self.__call__(**override_kwargs)
+        Images created by other shape functions are only encoded while rendering.
 
-        for fn in used_functions:
-            defs = self.declared_shapes.get(fn)
-            if defs:
-                definitions.update(defs)
+        Args:
+            workers (int | None): Number of threads. Defaults to the default of `ThreadPoolExecutor`.
+            **override_kwargs: Override kwargs the scene will be rendered with.
+
+        Returns:
+            int: The number of images.
+        """
+        pil_image_type = _try_import_pil_image()
+        jobs = []
+
+        def collect(group, other_kwargs):
+            for func, child_kwargs in group.children:
+                kwargs = {**child_kwargs, **other_kwargs}
+                if isinstance(func, Group):
+                    collect(func, func._split_call_kwargs(kwargs)[1])
+                elif func is tiled_image:
+                    collect(tiled_image(**{**kwargs, 'composer': self}), {})
+                elif func is image or func is _image_tile:
+                    data = kwargs.get('data')
+                    if func is _image_tile:
+                        box = kwargs['box']
+                        data = image_cache.derived(data, ('crop', box), lambda source: source.crop(box),
+                                                   kwargs['digest'])
+                    if isinstance(data, np.ndarray):
+                        names = ('colormap', 'vmin', 'vmax', 'image_format', 'quality', 'time_budget')
+                    elif pil_image_type is not None and isinstance(data, pil_image_type):
+                        names = ('sparse', 'image_format', 'quality', 'time_budget')
+                        if kwargs.get('downsample'):
+                            data = _displayed_image(data, kwargs.get('width'), kwargs.get('height'),
+                                                    kwargs['downsample'], kwargs.get('pyramid', False), composer=self)[0]
+                    else:
+                        continue
+                    jobs.append((data, {k: kwargs[k] for k in names if k in kwargs}))
+
+        collect(self, self._split_call_kwargs(override_kwargs)[1])
+        image_cache.encode_all(jobs, workers)
+        return len(jobs)
+
+    def _render_parallel(self, used_functions, workers, executor, pretty, override_kwargs):
+        """Evaluate the children in chunks in a pool of workers and return the lines of svg code in order."""
+        _, other_kwargs = self._split_call_kwargs(override_kwargs)
+        num_children = sum(
+            len(func.children) if isinstance(func, Group) else 1 for func, _ in self.children)
+        chunk_size = max(1, -(-num_children // (4 * workers)))
+        prefix = '  ' if pretty else ''
+
+        # Plan the output as a sequence of literal lines and chunks of children (tasks)
+        plan = []
+        pending = []
+
+        def add_tasks(children, kwargs, depth):
+            for start in range(0, len(children), chunk_size):
+                plan.append((children[start:start + chunk_size], kwargs, depth))
+
+        for child in self.children:
+            func, child_kwargs = child
+            if (isinstance(func, Group) and not isinstance(func, Composer) and not func.cache_size
+                    and len(func.children) > chunk_size):
+                add_tasks(pending, other_kwargs, 1)
+                pending = []
+                group_dict, group_kwargs = func._split_call_kwargs({**child_kwargs, **other_kwargs})
+                plan.append(self._open_tag(group_dict, prefix))
+                add_tasks(func.children, group_kwargs, 2)
+                plan.append(prefix + '</g>')
+            else:
+                pending.append(child)
+        add_tasks(pending, other_kwargs, 1)
+
+        if isinstance(executor, Executor):
+            return self._run_plan(executor, plan, used_functions, pretty)
+        return self._run_plan(self._worker_pool(executor, workers), plan, used_functions, pretty)
+
+    def _worker_pool(self, executor, workers):
+        """The pool kept for `render(workers=...)`, created on first use and replaced if its settings change."""
+        pool_types = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}
+        if executor not in pool_types:
+            raise ValueError(f"executor must be 'process', 'thread' or an Executor, not {executor!r}")
+        if self._pool is None or self._pool[0] != (executor, workers):
+            self.close()
+            self._pool = ((executor, workers), pool_types[executor](max_workers=workers))
+        return self._pool[1]
+
+    def close(self):
+        """Shut down the pool of workers kept by `render(workers=...)`, if any."""
+        if self._pool is not None:
+            self._pool[1].shutdown()
+            self._pool = None
+
+    def _run_plan(self, pool, plan, used_functions, pretty):
+        composer = self if isinstance(pool, ThreadPoolExecutor) else self._detached()
+        number_format_args = tuple(_number_format.get()[:2])
+        futures = [
+            item if isinstance(item, str) else pool.submit(
+                _render_chunk, item[0], composer, item[2], pretty, item[1], number_format_args)
+            for item in plan
+        ]
+        content = []
+        for item in futures:
+            if isinstance(item, str):
+                content.append(item)
+                continue
+            svg_code, funcs = item.result()
+            used_functions.update(funcs)
+            if svg_code:
+                content.append(svg_code)
+        return content
+
+    def _detached(self):
+        """Shallow copy without children, widget and caches, passed to shape functions in worker processes."""
+        composer = copy.copy(self)
+        composer.children = []
+        composer.widget = None
+        composer._pool = None
+        composer._render_cache = OrderedDict()
+        composer._fragments = _Fragments()
+        return composer
+
+    def compile(self, params, pretty=True, extra_defs=None, extra_attrib='', precision=None, minify=None,
+                **override_kwargs) -> 'Template':
+        """
+        Compile the composer into a template that only evaluates the children depending on `params`.
 
-        if len(definitions) > 0:
-            definitions = (
-                '  <defs>\n'
-                + "\n".join([indent(d, 4) for d in definitions.values()])
-                +'\n  </defs>\n')
+        All children which do not depend on any of the named override kwargs are rendered once,
+        right away. The others are kept as slots, which are filled in when the template is called.
+        Later changes to the composer and its groups are not reflected by the template.
 
+        Args:
+            params (list[str]): Names of the override kwargs passed to the template, e.g. ['P'].
+            pretty, extra_defs, extra_attrib, precision, minify: See `render()`.
+            **override_kwargs: Override kwargs which stay fixed for the template.
+
+        Returns:
+            Template: Callable with keyword arguments `params`, returning the SVG markup as a string.
+
+        Example:
+            template = svg.compile(params=['P'])
+            frames = [template(P=P @ rotation_z(angle)) for angle in angles]
+        """
+        params = frozenset(params)
+        conflicts = params & self.VALID_GROUP_ATTRIBUTES
+        if conflicts:
+            raise ValueError(f"Group attributes cannot be template parameters: {sorted(conflicts)}")
+        with number_format(precision, minify):
+            template = Template(self, params, pretty, extra_defs, extra_attrib)
+            self._compile(template, 0, **override_kwargs)
+        template.finalize()
+        return template
+
+    def _assemble(self, content, used_functions, extra_defs=None, extra_attrib='', pretty=True) -> str:
+        """Wrap the lines of svg code of the children into a complete <svg> element."""
+        definitions = self._definitions(used_functions, extra_defs, pretty)
+        separator = '\n' if pretty else ''
+        return separator.join(
+            [self._svg_open_tag(extra_attrib)]
+            + ([definitions] if definitions else [])
+            + content
+            + ['</svg>']
+        )
+
+    @property
+    def viewport(self):
+        """The area (xmin, ymin, xmax, ymax) shown by the viewBox, see `render(cull=True)`."""
+        w, h = self.image_size
+        return 0, 0, w, h
+
+    def _svg_open_tag(self, extra_attrib=''):
         s = getattr(self, 'scale', 1)
         w, h = self.image_size
-        raw_html = (
-            f'<svg {extra_attrib} width="{w*s}" height="{h*s}" '
-            f'viewBox="0 0 {w} {h}" xmlns="http://www.w3.org/2000/svg">\n'
-            + (definitions or "")
-            + child_svg
-            + '\n</svg>'
+        extra_attrib = f' {extra_attrib}' if extra_attrib else ''
+        return (
+            f'<svg{extra_attrib} width="{w*s}" height="{h*s}" '
+            f'viewBox="0 0 {w} {h}" xmlns="http://www.w3.org/2000/svg">'
         )
 
-        if debug:
-            return f'<details close><summary>show html</summary><pre>{html.escape(raw_html, quote=True)}</pre></details>\n{raw_html}'
-        else:
-            return raw_html
+    def _definitions(self, used_functions, extra_defs=None, pretty=True) -> str:
+        """Assemble the <defs> block for the definitions used during rendering (empty if there are none)."""
+        definitions = dict(extra_defs) if isinstance(extra_defs, dict) else {}
+        instances = _instances.get()
+        if instances is not None:
+            definitions.update(instances.definitions(used_functions))
+        for fn, defs in self.declared_shapes.items():
+            all_used = fn in used_functions
+            for def_id, definition in defs.items():
+                if all_used or def_id in used_functions:
+                    definitions[def_id] = definition
+        # Definitions may in turn reference other declared definitions, e.g. a pattern <use>-ing a shape
+        declared = None
+        pending = list(definitions)
+        while pending:
+            for def_id in _referenced_ids(definitions[pending.pop()]):
+                if def_id in definitions:
+                    continue
+                if declared is None:
+                    declared = {i: d for defs in self.declared_shapes.values() for i, d in defs.items()}
+                if def_id in declared:
+                    definitions[def_id] = declared[def_id]
+                    pending.append(def_id)
 
+        if len(definitions) == 0:
+            return ''
+        if not pretty:
+            definitions = '<defs>' + ''.join(definitions.values()) + '</defs>'
+            return _compact_markup(definitions, _number_format.get().minify)
+        return (
+            '  <defs>\n'
+            + "\n".join(['    ' + d.replace('\n', '\n    ') for d in definitions.values()])
+            + '\n  </defs>')
 
-    def update(self, **override_kwargs) -> None:
+    def update(self, incremental=False, **override_kwargs) -> None:
+        """
+        Update the displayed SVG widget in Jupyter.
+
+        Args:
+            incremental (bool, optional): If True, only children affected by changes since the last
+                incremental update are evaluated again, see `render(incremental=True)`. Only use this
+                if the shape functions depend on nothing but their kwargs. Defaults to False.
+            **override_kwargs: Passed on to `render()`.
+        """
         if self.widget is None:
             raise RuntimeError("You must call display() before update.")
-        self.widget.value = self.render(**override_kwargs)
+        self.widget.value = self.render(incremental=incremental, **override_kwargs)
 
     def display(self, debug: bool = False, **override_kwargs) -> None:
         """
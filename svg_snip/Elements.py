@@ -5,6 +5,9 @@ Basic SVG shapes:
     - Predefined functions for common SVG elements such as rect, circle, ellipse, line, text, path, polygon, and polyline.
     - Each function returns an SVG snippet string with provided attributes, enabling easy SVG composition.
 
+Batch SVG shapes:
+    - Functions circles, ellipses, rects, lines and texts, which take numpy arrays instead of scalars and generate many elements at once.
+
 Advanced SVG shapes:
     - Custom shape functions like cross, star, and heart that generate SVG <use> elements referencing predefined SVG groups.
     - An arrow function that creates an SVG arrow by combining a line and a polygon arrowhead.
@@ -36,14 +39,18 @@ See also: CanvasWithOverlay in Jupyter.py
 Generic generation of functions to create basic svg snippets (rect, line...)
 """
 
+import array
+
 import numpy as np
 
-from .Composer import Composer, image
+from .Composer import Composer, image, format_number, format_points, get_number_format, minify_path_data
+from .Bounds import points_box, stroke_margin
+from .Simplify import simplify, parse_points, parse_line_path
 
 
 def attributes(args_attributes, **kwargs):
     """ Build a string of SVG attributes.
-    Start description with "(float)" to round values to two digits."""
+    Start description with "(float)" to round values to two digits (see also Composer.number_format)."""
     svg_code = ''
     for arg_name, arg_desc in args_attributes.items():
         svg_arg_name = arg_name.replace('_', '-')  # Convert snake_case to kebab-case
@@ -51,12 +58,57 @@ def attributes(args_attributes, **kwargs):
             continue  # Special case: <element arg1="value1" ...>content</element>
         if arg_name in kwargs:
             if type(kwargs[arg_name]) != str and arg_desc.startswith('(float)'):
-                svg_code += f'{svg_arg_name}="{kwargs[arg_name]:.2f}" '
+                svg_code += f'{svg_arg_name}="{format_number(kwargs[arg_name])}" '
             else:
                 svg_code += f'{svg_arg_name}="{kwargs[arg_name]}" '
     return svg_code
 
 
+# Attributes holding lists of numbers, which are shortened when minifying
+_PATH_DATA_ATTRIBUTES = {'d', 'points'}
+
+
+def compile_attributes(args_attributes):
+    """
+    Compile an attribute description into a fast serializer, equivalent to `attributes()`.
+
+    Kebab-case names and the float/str classification of all attributes are computed once,
+    and the serializer only iterates over the kwargs actually passed. Attributes are written
+    in the order of the description. When minifying, path data (`d`) and `points` are shortened.
+
+    Parameters:
+    args_attributes (dict): Attribute names and descriptions, see `attributes()`.
+
+    Returns:
+    function: serialize(kwargs) -> str
+    """
+    spec = {
+        arg_name: (index, f'{arg_name.replace("_", "-")}="', arg_desc.startswith('(float)'),
+                   arg_name in _PATH_DATA_ATTRIBUTES)
+        for index, (arg_name, arg_desc) in enumerate(args_attributes.items())
+        if arg_name != 'content'
+    }
+
+    def serialize(kwargs):
+        number_format = get_number_format()
+        parts = []
+        for arg_name, value in kwargs.items():
+            entry = spec.get(arg_name)
+            if entry is None:
+                continue
+            index, prefix, is_float, is_path_data = entry
+            if is_float and type(value) != str:
+                parts.append((index, f'{prefix}{number_format.format(value)}" '))
+            elif is_path_data and number_format.minify:
+                parts.append((index, f'{prefix}{minify_path_data(value)}" '))
+            else:
+                parts.append((index, f'{prefix}{value}" '))
+        parts.sort()  # indices are unique, so the strings are never compared
+        return ''.join([part for _, part in parts])
+
+    return serialize
+
+
 def define_svg_element(element_attributes):
     """
     Define an SVG element function based on the given description.
@@ -67,14 +119,21 @@ def define_svg_element(element_attributes):
     Returns:
     function: The generated SVG element function.
     """
+    name = element_attributes["name"]
+    serialize = compile_attributes(element_attributes["args"])
+    open_tag = f'<{name} '
+    close_tag = f'</{name}>'
+
     def svg_element(**kwargs):
-        svg_code = f'<{element_attributes["name"]} '
-        svg_code += attributes(element_attributes["args"], **kwargs)
         if 'content' in kwargs:
-            svg_code += f'>{kwargs["content"]}</{element_attributes["name"]}>'
-        else:
-            svg_code += '/>'
-        return svg_code
+            return f'{open_tag}{serialize(kwargs)}>{kwargs["content"]}{close_tag}'
+        return open_tag + serialize(kwargs) + '/>'
+
+    # Named after the element, so that the function can be pickled (e.g. for worker processes)
+    svg_element.__name__ = svg_element.__qualname__ = name
+
+    # Keyword arguments the output depends on (see Composer.render(incremental=True))
+    svg_element.accepted_kwargs = frozenset(element_attributes["args"])
 
     # Add docstring to the generated function
     indent_line = "\n    "
@@ -270,6 +329,198 @@ polyline_attributes = {
 polyline = define_svg_element(polyline_attributes)
 
 
+"""
+Simplification of polylines, polygons and paths with many points (see Simplify.py)
+"""
+
+def _simplification(tolerance, tolerance_px, composer):
+    """Tolerance in user units, with `tolerance_px` in output pixels (see Composer.scale)."""
+    if tolerance_px is not None:
+        tolerance_px /= getattr(composer, 'scale', 1) or 1
+        tolerance = tolerance_px if tolerance is None else min(tolerance, tolerance_px)
+    return tolerance
+
+
+def _with_simplification(element, closed):
+    """
+    Wrap the function of a <polyline> or <polygon> element to accept simplification kwargs,
+    and `points` as (N, 2) array as well as string.
+    """
+    def simplified_element(points='', tolerance=None, tolerance_px=None, max_points=None, **kwargs):
+        tolerance = _simplification(tolerance, tolerance_px, kwargs.get('composer'))
+        if tolerance is not None or max_points is not None:
+            points = format_points(simplify(parse_points(points), tolerance, max_points, closed))
+        elif not isinstance(points, str):
+            points = format_points(points)
+        return element(points=points, **kwargs)
+
+    simplified_element.__name__ = simplified_element.__qualname__ = element.__name__
+    simplified_element.__doc__ = element.__doc__.replace(
+        '\n    Returns:', '\n    The points may also be given as (N, 2) array.\n' + _SIMPLIFICATION_DOC + '\n    Returns:', 1)
+    simplified_element.accepted_kwargs = element.accepted_kwargs | {'tolerance', 'tolerance_px', 'max_points'}
+    return simplified_element
+
+
+def _path_with_simplification(element):
+    """Wrap the function of the <path> element to simplify path data consisting of straight lines."""
+    def simplified_path(d='', tolerance=None, tolerance_px=None, max_points=None, **kwargs):
+        tolerance = _simplification(tolerance, tolerance_px, kwargs.get('composer'))
+        if tolerance is not None or max_points is not None:
+            subpaths = parse_line_path(d)
+            if subpaths is not None:
+                d = ' '.join(
+                    'M' + format_points(simplify(vertices, tolerance, max_points, closed)).replace(' ', ' L', 1)
+                    + (' Z' if closed else '')
+                    for vertices, closed in subpaths)
+        return element(d=d, **kwargs)
+
+    simplified_path.__name__ = simplified_path.__qualname__ = element.__name__
+    simplified_path.__doc__ = element.__doc__.replace('\n    Returns:', _SIMPLIFICATION_DOC + '\n    Returns:', 1)
+    simplified_path.accepted_kwargs = element.accepted_kwargs | {'tolerance', 'tolerance_px', 'max_points'}
+    return simplified_path
+
+
+_SIMPLIFICATION_DOC = """
+    Simplification (for many more points than pixels, see svg_snip.Simplify):
+    - tolerance (float): Douglas-Peucker tolerance in user units.
+    - tolerance_px (float): Douglas-Peucker tolerance in output pixels (i.e. divided by Composer.scale).
+    - max_points (int): Number of points to keep by largest-triangle-three-buckets.
+"""
+
+polygon = _with_simplification(polygon, closed=True)
+polyline = _with_simplification(polyline, closed=False)
+path = _path_with_simplification(path)
+
+
+"""
+Bounding boxes of the basic shapes, used for viewport culling (see Bounds.py)
+"""
+
+def _circle_bbox(cx=0, cy=0, r=0, **kwargs):
+    r = float(r) + stroke_margin(kwargs)
+    return float(cx) - r, float(cy) - r, float(cx) + r, float(cy) + r
+
+
+def _ellipse_bbox(cx=0, cy=0, rx=0, ry=0, **kwargs):
+    margin = stroke_margin(kwargs)
+    rx, ry = float(rx) + margin, float(ry) + margin
+    return float(cx) - rx, float(cy) - ry, float(cx) + rx, float(cy) + ry
+
+
+def _rect_bbox(x=0, y=0, width=0, height=0, **kwargs):
+    margin = stroke_margin(kwargs)
+    return float(x) - margin, float(y) - margin, float(x) + float(width) + margin, float(y) + float(height) + margin
+
+
+def _line_bbox(x1=0, y1=0, x2=0, y2=0, **kwargs):
+    return points_box([x1, y1, x2, y2], stroke_margin(kwargs, marker_size=12))
+
+
+def _points_bbox(points='', **kwargs):
+    return points_box(points, stroke_margin(kwargs, marker_size=12))
+
+
+circle.bbox = _circle_bbox
+ellipse.bbox = _ellipse_bbox
+rect.bbox = _rect_bbox
+
+# Position kwargs, which `Composer.render(instancing=True)` can replace by a translation
+circle.translation_kwargs = ellipse.translation_kwargs = ('cx', 'cy')
+rect.translation_kwargs = ('x', 'y')
+line.bbox = _line_bbox
+polygon.bbox = _points_bbox
+polyline.bbox = _points_bbox
+
+
+"""
+Batch Shapes (many elements from arrays)
+"""
+
+
+def define_svg_batch_element(element_attributes):
+    """
+    Define a function generating many SVG elements at once based on the given description.
+
+    The generated function accepts the same keyword arguments as the function from
+    `define_svg_element`, but each of them may be a scalar (shared by all elements) or a
+    1D array with one value per element. All elements are formatted in a single pass and
+    returned as one snippet, so that they can be added to a Group as a single child.
+
+    Parameters:
+    element_attributes (dict): A dictionary describing the SVG element.
+
+    Returns:
+    function: The generated SVG batch element function.
+    """
+    name = element_attributes["name"]
+    args = element_attributes["args"]
+
+    def svg_elements(**kwargs):
+        number_format = get_number_format()
+        template = f'<{name} '
+        columns = []
+        for arg_name, arg_desc in args.items():
+            if arg_name == 'content' or arg_name not in kwargs:
+                continue
+            value = kwargs[arg_name]
+            svg_arg_name = arg_name.replace('_', '-')
+            is_float = arg_desc.startswith('(float)')
+            if np.ndim(value) == 0:
+                if type(value) != str and is_float:
+                    value = number_format.format(value)
+                elif arg_name in _PATH_DATA_ATTRIBUTES and number_format.minify:
+                    value = minify_path_data(value)
+                template += f'{svg_arg_name}="{value}" '.replace('%', '%%')
+                continue
+            column = np.asarray(value)
+            if not is_float or column.dtype.kind not in 'fiub':
+                template += f'{svg_arg_name}="%s" '
+            elif number_format.minify:  # printf-style formatting cannot strip zeros
+                template += f'{svg_arg_name}="%s" '
+                column = np.array([number_format.format(v) for v in column.ravel().tolist()], dtype=object)
+            else:
+                template += f'{svg_arg_name}="%.{number_format.precision}f" '
+            columns.append(column)
+        if 'content' in kwargs:
+            if np.ndim(kwargs['content']) == 0:
+                template += f'>{kwargs["content"]}</{name}>'.replace('%', '%%')
+            else:
+                template += f'>%s</{name}>'
+                columns.append(np.asarray(kwargs['content']))
+        else:
+            template += '/>'
+
+        if not columns:
+            return template % ()
+        columns = np.broadcast_arrays(*columns)
+        count = len(columns[0])
+        values = np.empty((count, len(columns)), dtype=object)
+        for i, column in enumerate(columns):
+            values[:, i] = column
+        return '\n'.join([template] * count) % tuple(values.ravel().tolist())
+
+    svg_elements.__name__ = svg_elements.__qualname__ = name + 's'
+    svg_elements.accepted_kwargs = frozenset(args)
+    svg_elements.__doc__ = f"""
+    Generate SVG code for many <{name}> elements at once.
+
+    Each argument may be a scalar, shared by all elements, or a 1D array with one value per element.
+    See `{name}` for the list of arguments.
+
+    Returns:
+    str: SVG code for the <{name}> elements, one per line.
+    """
+
+    return svg_elements
+
+
+circles = define_svg_batch_element(circle_attributes)
+ellipses = define_svg_batch_element(ellipse_attributes)
+rects = define_svg_batch_element(rect_attributes)
+lines = define_svg_batch_element(line_attributes)
+texts = define_svg_batch_element(text_attributes)
+
+
 """
 Advanced Example (including definition) Shapes
 """
@@ -284,7 +535,11 @@ def cross(x=0, y=0, size=4, stroke='', **kwargs):
     """
     if stroke != '':
         stroke =  f'style="stroke: {stroke};"'
-    return f'<use {stroke} xlink:href="#cross" transform="translate({x:.2f},{y:.2f}) scale({size / 6:.2f})"/>'
+    return f'<use {stroke} xlink:href="#cross" transform="translate({format_number(x)},{format_number(y)}) scale({format_number(size / 6, extra_digits=2)})"/>'
+
+cross.accepted_kwargs = {'x', 'y', 'size', 'stroke'}
+cross.bbox = lambda x=0, y=0, size=4, **kwargs: (x - size, y - size, x + size, y + size)
+cross.translation_kwargs = ('x', 'y')
 
 Composer.declare(cross, {'cross': """<g id="cross">
   <line x1="-5" y1="-5" x2="5" y2="5" stroke-width="2"/>
@@ -302,9 +557,13 @@ def star(x=0, y=0, size=4, fill='', **kwargs):
     """
     if fill != '':
         fill = f'style="fill: {fill};"'
-    return f'<use {fill} xlink:href="#star" transform="translate({x:.2f},{y:.2f}) scale({size / 10:.2f})"/>'
+    return f'<use {fill} xlink:href="#star-shape" transform="translate({format_number(x)},{format_number(y)}) scale({format_number(size / 10, extra_digits=2)})"/>'
+
+star.accepted_kwargs = {'x', 'y', 'size', 'fill'}
+star.bbox = lambda x=0, y=0, size=4, **kwargs: (x - 1.1 * size, y - 1.1 * size, x + 1.1 * size, y + 1.1 * size)
+star.translation_kwargs = ('x', 'y')
 
-Composer.declare(star, {'star': """<g id="star">
+Composer.declare(star, {'star-shape': """<g id="star-shape">
   <polygon points="0,-10 2.76,-3.5 9.51,-3.5 4.63,1.5 7.39,8 0,4.5 -7.39,8 -4.63,1.5 -9.51,-3.5 -2.76,-3.5" stroke-width="2"/>
 </g>"""})
 
@@ -319,7 +578,11 @@ def heart(x=0, y=0, size=4, angle=0, fill='', **kwargs):
     """
     if fill != '' :
         fill = f'style="fill: {fill};"'
-    return f'<use {fill} xlink:href="#heart" transform="translate({x:.2f},{y:.2f}) scale({size / 10:.2f}) rotate({angle})"/>'
+    return f'<use {fill} xlink:href="#heart" transform="translate({format_number(x)},{format_number(y)}) scale({format_number(size / 10, extra_digits=2)}) rotate({angle})"/>'
+
+heart.accepted_kwargs = {'x', 'y', 'size', 'angle', 'fill'}
+heart.bbox = lambda x=0, y=0, size=4, **kwargs: (x - 1.9 * size, y - 1.9 * size, x + 1.9 * size, y + 1.9 * size)
+heart.translation_kwargs = ('x', 'y')
 
 Composer.declare(heart, {'heart': """<g id="heart">
 <path d="M8 1.314C12.438-3.248 23.534 4.735 8 15-7.534 4.736 3.562-3.248 8 1.314z"/>
@@ -358,6 +621,9 @@ def arrow(x1, y1, x2, y2, stroke='black', head='arrow-small', tail=None, **kwarg
 
     return line(**line_args)
 
+arrow.accepted_kwargs = {'x1', 'y1', 'x2', 'y2', 'stroke', 'head', 'tail'} | line.accepted_kwargs
+arrow.bbox = lambda x1, y1, x2, y2, **kwargs: points_box([x1, y1, x2, y2], 12 * max(float(kwargs.get('stroke_width', 1)), 1))
+
 # Declare active marker styles specifically for the arrow function
 Composer.declare(arrow, {
     # Barbed/Stealth arrowhead (smaller)
@@ -425,11 +691,11 @@ def conic(C: np.ndarray, **kwargs) -> str:
 
     # Compose attributes
     attrs = {
-        "cx": f"{center[0]:.2f}",
-        "cy": f"{center[1]:.2f}",
-        "rx": f"{rx:.2f}",
-        "ry": f"{ry:.2f}",
-        "transform": f"rotate({angle:.4f} {center[0]:.2f} {center[1]:.2f})"
+        "cx": format_number(center[0]),
+        "cy": format_number(center[1]),
+        "rx": format_number(rx),
+        "ry": format_number(ry),
+        "transform": f"rotate({format_number(angle, extra_digits=2)} {format_number(center[0])} {format_number(center[1])})"
     }
 
     # Add valid kwargs attributes (convert _ to -)
@@ -442,3 +708,186 @@ def conic(C: np.ndarray, **kwargs) -> str:
 
     return f"<ellipse {attr_str} />"
 
+conic.accepted_kwargs = {'C'} | set(default_attributes) | set(stroke_attributes) | set(fill_attributes)
+
+
+"""
+Path builder (path data from typed arrays instead of string concatenation)
+"""
+
+# Command codes, number of arguments and letters of the relative commands
+_MOVE, _LINE, _CUBIC, _ARC, _CLOSE = range(5)
+_PATH_ARGS = np.array([2, 2, 6, 7, 0])
+_PATH_LETTERS = np.array(['m', 'l', 'c', 'a', 'z', 'h', 'v'])
+_HORIZONTAL, _VERTICAL = 5, 6
+
+# Arguments which are x or y coordinates (relative to the current point) by command and position
+_PATH_X = np.zeros((5, 7), dtype=bool)
+_PATH_Y = np.zeros((5, 7), dtype=bool)
+_PATH_X[[_MOVE, _LINE, _CUBIC, _CUBIC, _CUBIC, _ARC], [0, 0, 0, 2, 4, 5]] = True
+_PATH_Y[[_MOVE, _LINE, _CUBIC, _CUBIC, _CUBIC, _ARC], [1, 1, 1, 3, 5, 6]] = True
+
+
+class Path:
+    """
+    Builder of a <path> element, storing commands and coordinates in compact typed arrays.
+
+    The path data is only serialized when the path is rendered, with relative coordinates,
+    horizontal and vertical lines where possible and without repeated command letters, using
+    the number format of the rendering pass. A Path can be added to a Group like any shape function.
+
+    Args:
+        **kwargs: Attributes of the <path> element, see `path`. kwargs passed by `Group.add` take precedence.
+
+    Example:
+        outline = Path(fill='none', stroke='red')
+        outline.move_to(0, 0).line_to(10, 0).cubic_to(15, 0, 15, 10, 10, 10).close()
+        outline.polyline(contour_points, closed=True)  # (N, 2) array
+        svg.add(outline)
+    """
+
+    def __init__(self, **kwargs):
+        self.attributes = kwargs
+        self.accepted_kwargs = path.accepted_kwargs - {'d'}
+        self._codes = array.array('B')
+        self._coords = array.array('d')
+        self._version = 0
+        self._cache = None
+
+    def _append(self, code, *coords):
+        self._codes.append(code)
+        self._coords.extend(coords)
+        self._version += 1
+        return self
+
+    def _append_many(self, code, values, columns):
+        values = np.ascontiguousarray(values, dtype=np.float64).reshape(-1, columns)
+        self._codes.frombytes(bytes([code]) * len(values))
+        self._coords.frombytes(values.tobytes())
+        self._version += 1
+        return self
+
+    def move_to(self, x, y):
+        """Start a new subpath at (x, y)."""
+        return self._append(_MOVE, x, y)
+
+    def line_to(self, x, y):
+        return self._append(_LINE, x, y)
+
+    def cubic_to(self, x1, y1, x2, y2, x, y):
+        """Cubic Bézier curve to (x, y) with the control points (x1, y1) and (x2, y2)."""
+        return self._append(_CUBIC, x1, y1, x2, y2, x, y)
+
+    def arc_to(self, rx, ry, rotation, large_arc, sweep, x, y):
+        """Elliptical arc to (x, y), see the svg `A` command."""
+        return self._append(_ARC, rx, ry, rotation, int(bool(large_arc)), int(bool(sweep)), x, y)
+
+    def close(self):
+        """Close the current subpath."""
+        return self._append(_CLOSE)
+
+    def lines_to(self, points):
+        """Straight lines through all points of an (N, 2) array."""
+        return self._append_many(_LINE, points, 2)
+
+    def cubics_to(self, controls):
+        """Cubic Bézier curves from an (N, 6) array with rows (x1, y1, x2, y2, x, y)."""
+        return self._append_many(_CUBIC, controls, 6)
+
+    def polyline(self, points, closed=False):
+        """A new subpath through all points of an (N, 2) array, optionally closed."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not len(points):
+            return self
+        self.move_to(*points[0].tolist())
+        self.lines_to(points[1:])
+        return self.close() if closed else self
+
+    def __len__(self):
+        return len(self._codes)
+
+    def fingerprint(self):
+        """Changes whenever the path is modified, see `Composer.render(incremental=True)`."""
+        return id(self), self._version
+
+    def d(self) -> str:
+        """The path data, formatted with the number format of the current rendering pass."""
+        number_format = get_number_format()
+        key = (self._version, number_format.precision, number_format.minify)
+        if self._cache is None or self._cache[0] != key:
+            data = self._serialize(number_format.precision)
+            self._cache = (key, minify_path_data(data) if number_format.minify else data)
+        return self._cache[1]
+
+    def _serialize(self, precision):
+        if not self._codes:
+            return ''
+        codes = np.frombuffer(self._codes, dtype=np.uint8).astype(np.intp)
+        if codes[0] != _MOVE:
+            raise ValueError("Path data has to start with move_to()")
+        coords = np.round(np.frombuffer(self._coords, dtype=np.float64), precision)
+        counts = _PATH_ARGS[codes]
+        offsets = np.cumsum(counts) - counts
+        commands = np.arange(len(codes))
+
+        # Current point after each command (the start of the subpath after close)
+        has_end = counts > 0
+        ends = np.zeros((len(codes), 2))
+        ends[has_end, 0] = coords[offsets[has_end] + counts[has_end] - 2]
+        ends[has_end, 1] = coords[offsets[has_end] + counts[has_end] - 1]
+        subpath = np.maximum.accumulate(np.where(codes == _MOVE, commands, 0))
+        ends[~has_end] = ends[subpath[~has_end]]
+        previous = np.vstack([[0.0, 0.0], ends[:-1]])
+
+        # Relative coordinates
+        owner = np.repeat(commands, counts)
+        position = np.arange(len(coords)) - offsets[owner]
+        relative = (coords - _PATH_X[codes[owner], position] * previous[owner, 0]
+                    - _PATH_Y[codes[owner], position] * previous[owner, 1])
+
+        # Horizontal and vertical lines drop one of their coordinates
+        letters = codes.copy()
+        is_line = codes == _LINE
+        dx, dy = relative[np.minimum(offsets, len(coords) - 1)], relative[np.minimum(offsets + 1, len(coords) - 1)]
+        letters[is_line & (dy == 0)] = _HORIZONTAL
+        letters[is_line & (dy != 0) & (dx == 0)] = _VERTICAL
+        keep = np.ones(len(coords), dtype=bool)
+        keep[offsets[letters == _HORIZONTAL] + 1] = False
+        keep[offsets[letters == _VERTICAL]] = False
+
+        # Repeated commands (and lines following a move) do not repeat the letter
+        implicit = np.where(codes == _MOVE, _LINE, letters)
+        elided = np.zeros(len(codes), dtype=bool)
+        elided[1:] = (letters[1:] == implicit[:-1]) & (letters[1:] != _CLOSE)
+
+        number = f'%.{precision}f'
+        arguments = {
+            _MOVE: f'{number},{number}', _LINE: f'{number},{number}', _HORIZONTAL: number, _VERTICAL: number,
+            _CUBIC: f'{number},{number} {number},{number} {number},{number}',
+            _ARC: f'{number} {number} {number} %d %d {number},{number}', _CLOSE: '',
+        }
+        template = ''.join([
+            (' ' if is_elided else _PATH_LETTERS[letter]) + arguments[letter]
+            for letter, is_elided in zip(letters.tolist(), elided.tolist())])
+        return template % tuple(relative[keep].tolist())
+
+    def bbox(self, **kwargs):
+        """Bounds of all points including control points (and arc radii), see `svg_snip.Bounds`."""
+        if not self._codes:
+            return None
+        codes = np.frombuffer(self._codes, dtype=np.uint8).astype(np.intp)
+        coords = np.frombuffer(self._coords, dtype=np.float64)
+        counts = _PATH_ARGS[codes]
+        owner = np.repeat(np.arange(len(codes)), counts)
+        position = np.arange(len(coords)) - (np.cumsum(counts) - counts)[owner]
+        xs = coords[_PATH_X[codes[owner], position]]
+        ys = coords[_PATH_Y[codes[owner], position]]
+        margin = stroke_margin({**self.attributes, **kwargs}, marker_size=12)
+        arcs = codes == _ARC
+        if arcs.any():
+            starts = (np.cumsum(counts) - counts)[arcs]
+            margin += 2 * float(max(coords[starts].max(), coords[starts + 1].max()))
+        return float(xs.min()) - margin, float(ys.min()) - margin, float(xs.max()) + margin, float(ys.max()) + margin
+
+    def __call__(self, **kwargs):
+        return path(d=self.d(), **{**self.attributes, **kwargs})
@@ -46,11 +46,14 @@ vis.display()
 
 import numpy as np
 
-from .Composer import Composer, Group
+from .Composer import Composer, Group, format_points
 from .Elements import line as line2D
 from .Elements import text as text2D
 from .Elements import arrow as arrow2D
 from .Elements import circle
+from .Elements import circles as circles2D
+from .Elements import lines as lines2D
+from .Elements import texts as texts2D
 
 """
 Some projective Geometry utility.
@@ -71,6 +74,23 @@ def dehomogenize(vector):
     vector = cvec(vector)
     return vector[0:-1] / vector[-1]
 
+def project(P, Xs):
+    """
+    Project points, given as (N, 4) homogeneous or (N, 3) euclidean array (or list of vectors),
+    to an (N, 2) array of image points with a single matrix multiplication.
+    """
+    Xs = np.asarray(Xs, dtype=float).reshape(len(Xs), -1)
+    P = np.asarray(P, dtype=float)
+    if Xs.shape[1] == 3:
+        x = Xs @ P[:, :3].T + P[:, 3]
+    else:
+        x = Xs @ P.T
+    return x[:, :2] / x[:, 2:]
+
+def _front_facing(xs):
+    """Whether the first three image points of a polygon are in counter-clockwise order (image coordinates)."""
+    return (xs[1, 0]-xs[0, 0])*(xs[2, 1]-xs[0, 1]) - (xs[1, 1]-xs[0, 1])*(xs[2, 0]-xs[0, 0]) > 0
+
 def rgba2hex(r, g, b, a=0.5):
     """
     Convert RGB or RGBA values (0-1) to a hex string.
@@ -136,9 +156,58 @@ def arrow(P, X1, X2, stroke="green", text=None, **kwargs):
     )
 
 
+"""
+Batch 3D Elements (many elements from arrays, projected at once)
+"""
+
+def points(P, Xs, r=3, fill="purple", **kwargs):
+    """
+    Many 3D points as <circle> elements, see `point`.
+
+    Parameters:
+    - P (numpy 3x4 matrix): Projection matrix.
+    - Xs (array-like): (N, 3) euclidean or (N, 4) homogeneous points.
+    - r, fill and further kwargs: scalars or arrays with one value per point, see `Elements.circles`.
+    """
+    xs = project(P, Xs)
+    return circles2D(cx=xs[:, 0], cy=xs[:, 1], r=r, fill=fill, **kwargs)
+
+
+def lines(P, X1s, X2s, stroke="green", **kwargs):
+    """
+    Many 3D line segments from X1s[i] to X2s[i] as <line> elements, see `line` and `Elements.lines`.
+    """
+    X1s = np.asarray(X1s, dtype=float).reshape(len(X1s), -1)
+    xs = project(P, np.concatenate([X1s, np.asarray(X2s, dtype=float).reshape(len(X1s), -1)]))
+    n = len(X1s)
+    return lines2D(x1=xs[:n, 0], y1=xs[:n, 1], x2=xs[n:, 0], y2=xs[n:, 1], stroke=stroke, **kwargs)
+
+
+def arrows(P, X1s, X2s, stroke="green", head='arrow-small', tail=None, **kwargs):
+    """
+    Many 3D arrows from X1s[i] to X2s[i], see `arrow`. The markers are shared by all arrows.
+    """
+    if head:
+        kwargs["marker_end"] = f"url(#{head})"
+    if tail:
+        kwargs["marker_start"] = f"url(#{tail})"
+    return lines(P, X1s, X2s, stroke=stroke, **kwargs)
+
+
+def texts(P, Xs, labels, **kwargs):
+    """
+    Many labels at 3D points as <text> elements, see `text`.
+
+    Parameters:
+    - Xs (array-like): (N, 3) euclidean or (N, 4) homogeneous points.
+    - labels (list[str]): One text per point (or a single text for all of them).
+    """
+    xs = project(P, Xs)
+    return texts2D(x=xs[:, 0], y=xs[:, 1], content=labels, **kwargs)
+
+
 def wire_polygon(P, Xs, fill="none", stroke="black", **kwargs):
-    xs = [dehomogenize(P@cvec(X)) for X in Xs]
-    xs = ' '.join([f'{round(x[0][0],2)},{round(x[1][0],2)}' for x in xs])
+    xs = format_points(project(P, Xs))
     return f'<polygon points="{xs}" fill="{fill}" stroke="{stroke}" />'
 
 
@@ -146,9 +215,9 @@ def polygon(P, Xs, fill="#00ff4080", stroke="black", stroke_back="#00000080", **
     """
     Draw a 3D polygon from 4D homogeneous points.
     """
-    xs = [dehomogenize(P @ cvec(X)) for X in Xs]
-    front_facing = (xs[1][0]-xs[0][0])*(xs[2][1]-xs[0][1]) - (xs[1][1]-xs[0][1])*(xs[2][0]-xs[0][0]) > 0
-    xs = ' '.join([f'{round(x[0][0],2)},{round(x[1][0],2)}' for x in xs])
+    xs = project(P, Xs)
+    front_facing = _front_facing(xs)
+    xs = format_points(xs)
     style_attr = f'stroke="{stroke}" fill="{fill}"' if front_facing else f'stroke="{stroke_back}" fill="none"'
     return f'<polygon points="{xs}" {style_attr} />'
 
@@ -158,7 +227,8 @@ def polygon_with_lighting(P, Xs, fill="#00ff4080", stroke="none", **kwargs):
     Draw a 3D polygon with simple Lambertian lighting applied as a brightness filter.
     """
     # Convert points to 3D euclidean vectors
-    pts = [dehomogenize(X).flatten() for X in Xs]  # first 3 points for normal
+    Xs = np.asarray(Xs, dtype=float).reshape(len(Xs), -1)
+    pts = Xs[:3, :3] / Xs[:3, 3:]  # first 3 points for normal
     normal = np.cross(pts[1] - pts[0], pts[2] - pts[0])
     light_dir = P[2, 0:3].flatten() / np.linalg.norm(P[2, 0:3])
     b = 0.5 + 0.5 * np.abs(np.dot(light_dir, normal / np.linalg.norm(normal)))
@@ -167,12 +237,11 @@ def polygon_with_lighting(P, Xs, fill="#00ff4080", stroke="none", **kwargs):
     # fill = rgba2hex(b,b,b)
 
     # Project all points to 2D for SVG
-    xs = [dehomogenize(P @ X).flatten() for X in Xs]
-    front_facing = (xs[1][0]-xs[0][0])*(xs[2][1]-xs[0][1]) - (xs[1][1]-xs[0][1])*(xs[2][0]-xs[0][0]) > 0
-    if not front_facing:
+    xs = project(P, Xs)
+    if not _front_facing(xs):
         return ""
 
-    xs_str = ' '.join([f'{round(x[0],2)},{round(x[1],2)}' for x in xs])
+    xs_str = format_points(xs)
     style_attr = f'fill="{fill}"'
     if stroke is not None and stroke != "none":
         style_attr += f' stroke="{stroke}"'
@@ -248,38 +317,112 @@ def cube(P, min, max, fill="#00ff4080", **kwargs):
     return svg
 
 
+# Vertices of the icosahedron (t is the golden ratio) and its faces
+_t = (1 + np.sqrt(5)) / 2
+_ICOSAHEDRON_VERTICES = np.array([
+    [-1, _t, 0], [1, _t, 0], [-1, -_t, 0], [1, -_t, 0],
+    [0, -1, _t], [0, 1, _t], [0, -1, -_t], [0, 1, -_t],
+    [_t, 0, -1], [_t, 0, 1], [-_t, 0, -1], [-_t, 0, 1]
+])
+_ICOSAHEDRON_FACES = np.array([
+    [0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+    [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+    [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+    [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]
+])
+
+_icospheres = {}
+
+
+def icosphere(subdivisions=1):
+    """
+    Geodesic unit sphere from a recursively subdivided icosahedron, cached per level.
+
+    Every subdivision splits each triangle into four, with one new vertex per edge shared by both
+    adjacent triangles. The returned arrays are read-only, since they are shared by all callers.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (V, 3) vertices and (F, 3) vertex indices of the triangles,
+            with V = 10 * 4**subdivisions + 2 and F = 20 * 4**subdivisions.
+    """
+    subdivisions = int(subdivisions)
+    if subdivisions < 0:
+        raise ValueError(f"subdivisions must not be negative, not {subdivisions}")
+    if subdivisions in _icospheres:
+        return _icospheres[subdivisions]
+    if subdivisions == 0:
+        verts, faces = _ICOSAHEDRON_VERTICES, _ICOSAHEDRON_FACES
+        verts = verts / np.linalg.norm(verts, axis=1, keepdims=True)
+    else:
+        verts, faces = icosphere(subdivisions - 1)
+        # Edges (f0, f1), (f1, f2), (f2, f0) of all faces, each shared edge numbered once
+        edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+        edges.sort(axis=1)
+        unique, inverse = np.unique(edges[:, 0] * len(verts) + edges[:, 1], return_inverse=True)
+        midpoints = (verts[unique // len(verts)] + verts[unique % len(verts)]) / 2
+        midpoints /= np.linalg.norm(midpoints, axis=1, keepdims=True)
+        a, b, c = (len(verts) + inverse.reshape(3, -1))
+        f0, f1, f2 = faces.T
+        faces = np.stack([
+            np.stack([f0, a, c], axis=1), np.stack([a, f1, b], axis=1),
+            np.stack([c, b, f2], axis=1), np.stack([a, b, c], axis=1),
+        ], axis=1).reshape(-1, 3)
+        verts = np.concatenate([verts, midpoints])
+    verts.flags.writeable = False
+    faces.flags.writeable = False
+    _icospheres[subdivisions] = verts, faces
+    return verts, faces
+
+
+def polygons_with_lighting(P, Xs, faces, fill="#00ff4080", stroke="none", **kwargs):
+    """
+    Many 3D polygons of a mesh with the same lighting as `polygon_with_lighting`, in one pass.
+
+    Parameters:
+    - P (numpy 3x4 matrix): Projection matrix.
+    - Xs (array-like): (V, 4) homogeneous or (V, 3) euclidean vertices, projected once.
+    - faces (array-like): (F, K) vertex indices of the polygons. Back faces are not drawn.
+    """
+    Xs = np.asarray(Xs, dtype=float)
+    faces = np.asarray(faces)
+    xs = project(P, Xs)[faces]
+    pts = Xs[:, :3] / Xs[:, 3:] if Xs.shape[1] == 4 else Xs
+    pts = pts[faces[:, :3]]
+    normals = np.cross(pts[:, 1] - pts[:, 0], pts[:, 2] - pts[:, 0])
+    light_dir = P[2, 0:3].flatten() / np.linalg.norm(P[2, 0:3])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        b = 0.5 + 0.5 * np.abs(normals @ light_dir / np.linalg.norm(normals, axis=1))
+    b = np.clip(np.nan_to_num(b * 100, nan=0).astype(int), 0, 100)
+    front = ((xs[:, 1, 0] - xs[:, 0, 0]) * (xs[:, 2, 1] - xs[:, 0, 1])
+             - (xs[:, 1, 1] - xs[:, 0, 1]) * (xs[:, 2, 0] - xs[:, 0, 0])) > 0
+    if not front.any():
+        return ""
+    k = faces.shape[1]
+    coordinates = format_points(xs[front].reshape(-1, 2)).split(' ')
+    style_attr = f'fill="{fill}"'
+    if stroke is not None and stroke != "none":
+        style_attr += f' stroke="{stroke}"'
+    return '\n'.join([
+        f'<polygon points="{" ".join(coordinates[i * k:(i + 1) * k])}" {style_attr} style="filter:brightness({brightness}%)" />'
+        for i, brightness in enumerate(b[front].tolist())])
+
+
 def sphere(P, center=(0,0,0,1), radius=50.0, subdivisions=True, fill="#00ff4080", **kwargs):
-    """Render a geodesic sphere as SVG polygons with optional lighting."""
+    """
+    Render a geodesic sphere as SVG polygons with lighting.
+
+    The unit sphere of each level of `subdivisions` (True for 1) is computed once, see `icosphere`,
+    and only scaled and translated here.
+    """
     center = dehomogenize(center).flatten()
-    t = (1+np.sqrt(5))/2
-    verts = [normalize(v) for v in [
-        [-1,t,0],[1,t,0],[-1,-t,0],[1,-t,0],
-        [0,-1,t],[0,1,t],[0,-1,-t],[0,1,-t],
-        [t,0,-1],[t,0,1],[-t,0,-1],[-t,0,1]
-    ]]
-    faces = [
-        [0,11,5],[0,5,1],[0,1,7],[0,7,10],[0,10,11],
-        [1,5,9],[5,11,4],[11,10,2],[10,7,6],[7,1,8],
-        [3,9,4],[3,4,2],[3,2,6],[3,6,8],[3,8,9],
-        [4,9,5],[2,4,11],[6,2,10],[8,6,7],[9,8,1]
-    ]
-    for s in range(1 if subdivisions else 0): # more subdivs possible but very expensive!
-        new_faces=[]
-        for f in faces:
-            a=normalize((verts[f[0]]+verts[f[1]])/2)
-            b=normalize((verts[f[1]]+verts[f[2]])/2)
-            c=normalize((verts[f[2]]+verts[f[0]])/2)
-            verts.extend([a,b,c])
-            i=len(verts)-3
-            new_faces+=[[f[0],i,i+2],[i,f[1],i+1],[i+2,i+1,f[2]],[i,i+1,i+2]]
-        faces=new_faces
-    # scale and translate vertices
-    verts=[np.append(np.array(v)*radius+np.array(center),1.0) for v in verts]
+    verts, faces = icosphere(int(subdivisions))
+    Xs = np.empty((len(verts), 4))
+    Xs[:, :3] = verts * radius + center
+    Xs[:, 3] = 1.0
 
     # render SVG
     svg = Group("Geodesic Sphere")
-    for f in faces:
-        svg.add(polygon_with_lighting, P=P, Xs=[verts[i] for i in f], fill=fill, **kwargs)
+    svg.add(polygons_with_lighting, P=P, Xs=Xs, faces=faces, fill=fill, **kwargs)
     return svg
 
 
@@ -0,0 +1,501 @@
+"""
+Encoding of raster images embedded in svg code, with a cache of the encoded payloads.
+
+Created for svg_snip, see `image()` in Composer.py
+
+Encoding a background image to JPEG/PNG and base64 usually dominates the time of a rendering.
+The encoded payloads are therefore kept in an LRU cache keyed by a hash of the pixel data and
+the encoding parameters, so that re-rendering (e.g. on every mouse move of a CanvasWithOverlay)
+reuses them. Since the key depends on the content, modified images are encoded again.
+
+Usage:
+    from svg_snip.Images import image_cache
+    image_cache.max_bytes = 256 * 2**20  # memory cap of the cache, 64 MiB by default
+    image_cache.clear()
+
+    # Hashing large images takes a fraction of the encoding time. For images which are never
+    # modified in place, the hash can be computed once per image object instead:
+    image_cache.assume_immutable = True
+
+NumPy arrays (grayscale, gray+alpha, RGB or RGBA) are converted to 8 bit pixels with optional
+windowing and colormap (`array_pixels()`) and written by a PNG encoder based on zlib (`encode_png()`),
+i.e. without Pillow:
+    svg.add(image, data=heatmap, colormap='viridis', vmin=0, vmax=1)
+"""
+
+import io
+import math
+import time
+import base64
+import hashlib
+import zlib
+import struct
+import weakref
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def image_digest(pil_image) -> bytes:
+    """Hash of the mode, size and pixel data (and palette) of a PIL image."""
+    digest = hashlib.sha1()
+    digest.update(f'{pil_image.mode} {pil_image.size}'.encode())
+    width, height = pil_image.size
+    rows = max(1, (1 << 24) // max(1, width * len(pil_image.getbands())))
+    if rows >= height:
+        digest.update(pil_image.tobytes())
+    else:  # in stripes of about 16 MiB, e.g. for scans of several GiB
+        for top in range(0, height, rows):
+            digest.update(pil_image.crop((0, top, width, min(top + rows, height))).tobytes())
+    if pil_image.mode == 'P':
+        digest.update(bytes(pil_image.getpalette() or ()))
+    return digest.digest()
+
+
+def _save(pil_image, image_format, **params) -> bytes:
+    buffered = io.BytesIO()
+    pil_image.save(buffered, format=image_format, **params)
+    return buffered.getvalue()
+
+
+def _has_alpha(pil_image) -> bool:
+    return pil_image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in pil_image.info
+
+
+def _webp_available() -> bool:
+    from PIL import features
+    return features.check('webp')
+
+
+def _auto_candidates(pil_image, sparse, quality):
+    """Functions encoding the image in the formats tried by `encode_image(image_format='auto')`, cheapest first."""
+    from PIL import Image as PILImageModule
+    opaque = not _has_alpha(pil_image)
+    if opaque and pil_image.mode in ('L', 'RGB', 'P'):
+        jpeg_image = pil_image if pil_image.mode != 'P' else pil_image.convert('RGB')
+        yield 'jpeg', lambda: _save(jpeg_image, 'JPEG', quality=quality)
+    if pil_image.mode != 'P':
+        # Lossless with a palette if there are few colors, or quantized if asked for with `sparse`
+        colors = pil_image.getcolors(256)
+        if colors is not None or (sparse is not None and sparse > 1):
+            count = len(colors) if colors is not None else sparse
+            method = PILImageModule.Quantize.FASTOCTREE if pil_image.mode in ('RGB', 'RGBA') else None
+            yield 'png', lambda: _save(pil_image.quantize(colors=count, method=method), 'PNG')
+    yield 'png', lambda: _save(pil_image, 'PNG')
+    if _webp_available():
+        yield 'webp', lambda: _save(pil_image, 'WEBP', quality=quality)
+
+
+def encode_image(pil_image, sparse=0, image_format=None, quality=85, time_budget=0.25):
+    """
+    Encode a PIL image for a data URI.
+
+    Args:
+        pil_image (PIL.Image.Image): The image.
+        sparse (int | None): If > 0 (and `image_format` is None), optimized PNG, quantized to this
+            many colors if > 1. Otherwise JPEG.
+        image_format (str | None): 'jpeg', 'png' or 'webp' to use that format, or 'auto' to try
+            JPEG, PNG with a palette (if the image has at most 256 colors, or `sparse` > 1),
+            lossless PNG and WebP (if available) and keep the smallest result. None selects the
+            format by `sparse`.
+        quality (int): Quality of JPEG and WebP. Defaults to 85.
+        time_budget (float): With 'auto', no further formats are tried once this many seconds
+            have passed. Defaults to 0.25.
+
+    Returns:
+        tuple[str, str]: Format (i.e. 'png', 'jpeg' or 'webp') and base64 encoded data.
+    """
+    if image_format is None:
+        if sparse is not None and sparse > 0:
+            img_format = "png"
+            if sparse > 1:
+                from PIL import Image as PILImageModule
+                pil_image = pil_image.convert("P", palette=PILImageModule.ADAPTIVE, colors=sparse)
+            encoded = _save(pil_image, "PNG", optimize=True)
+        else:
+            img_format = "jpeg"
+            encoded = _save(pil_image, "JPEG")
+    elif image_format == 'auto':
+        deadline = time.perf_counter() + time_budget
+        img_format, encoded = None, None
+        for candidate_format, encode in _auto_candidates(pil_image, sparse, quality):
+            candidate = encode()
+            if encoded is None or len(candidate) < len(encoded):
+                img_format, encoded = candidate_format, candidate
+            if time.perf_counter() > deadline:
+                break
+    elif image_format in ('jpeg', 'webp'):
+        img_format, encoded = image_format, _save(pil_image, image_format.upper(), quality=quality)
+    elif image_format == 'png':
+        img_format, encoded = 'png', _save(pil_image, 'PNG')
+    else:
+        raise ValueError(f"image_format must be None, 'auto', 'jpeg', 'png' or 'webp', not {image_format!r}")
+    return img_format, base64.b64encode(encoded).decode()
+
+
+@functools.lru_cache(maxsize=32)
+def _named_colormap(name):
+    if name in ('gray', 'grey'):
+        return np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+    try:
+        from matplotlib import colormaps
+    except ImportError as exc:
+        raise RuntimeError(
+            f"matplotlib is required for the colormap '{name}'. "
+            "Pass a lookup table (e.g. an (N, 3) array) or a callable instead.") from exc
+    return colormap_table(colormaps[name])
+
+
+def colormap_table(colormap) -> np.ndarray:
+    """
+    (256, 3) or (256, 4) uint8 lookup table of a colormap.
+
+    Args:
+        colormap (str | np.ndarray | Callable): 'gray', the name of a matplotlib colormap, an (N, 3)
+            or (N, 4) array of colors (uint8, or floats in [0, 1]), or a function mapping an array of
+            values in [0, 1] to such colors (e.g. a matplotlib colormap).
+    """
+    if isinstance(colormap, str):
+        return _named_colormap(colormap)
+    if callable(colormap):
+        colormap = colormap(np.linspace(0, 1, 256))
+    table = np.asarray(colormap)
+    if table.ndim != 2 or table.shape[1] not in (3, 4):
+        raise ValueError(f"colormap must have shape (N, 3) or (N, 4), not {table.shape}")
+    if table.dtype.kind == 'f':
+        table = np.clip(np.round(table * 255), 0, 255)
+    table = table.astype(np.uint8)
+    if len(table) != 256:
+        table = table[np.round(np.linspace(0, len(table) - 1, 256)).astype(int)]
+    if table.shape[1] == 4 and np.all(table[:, 3] == 255):
+        table = table[:, :3]
+    return table
+
+
+def _window(array, vmin, vmax) -> np.ndarray:
+    """`array` mapped from `vmin`...`vmax` to 8 bit, NaN to 0."""
+    pixels = np.subtract(array, vmin, dtype=np.float32)
+    pixels *= 255 / (vmax - vmin) if vmax > vmin else 0
+    np.clip(pixels, 0, 255, out=pixels)
+    pixels += 0.5
+    return np.nan_to_num(pixels, copy=False).astype(np.uint8)
+
+
+def array_pixels(array, colormap=None, vmin=None, vmax=None) -> np.ndarray:
+    """
+    8 bit pixels of an image given as NumPy array.
+
+    Arrays other than uint8 (e.g. float or uint16), or with `vmin`/`vmax`, are windowed: `vmin` maps
+    to 0 and `vmax` to 255, NaN to 0. The window of grayscale images defaults to their finite minimum
+    and maximum, the one of color images to 0...1 for floats and to the range of the integer type.
+    Alpha channels are never windowed by `vmin`/`vmax`.
+
+    Args:
+        array (np.ndarray): (H, W) grayscale, or (H, W, C) with C = 1, 2 (gray and alpha), 3 (RGB) or 4 (RGBA).
+        colormap: Colormap of grayscale images, see `colormap_table()`.
+        vmin, vmax (float | None): The window.
+
+    Returns:
+        np.ndarray: C-contiguous uint8 array of shape (H, W) or (H, W, C).
+    """
+    array = np.asarray(array)
+    if array.ndim == 3 and array.shape[2] == 1:
+        array = array[..., 0]
+    if array.ndim not in (2, 3) or (array.ndim == 3 and array.shape[2] not in (2, 3, 4)):
+        raise ValueError(f"image arrays must have shape (H, W) or (H, W, 1|2|3|4), not {array.shape}")
+    if array.dtype == bool:
+        array = array.astype(np.uint8) * np.uint8(255)
+    elif array.dtype != np.uint8 or vmin is not None or vmax is not None:
+        default = (0, 1) if array.dtype.kind == 'f' else (0, np.iinfo(array.dtype).max)
+        if array.ndim == 2 and (vmin is None or vmax is None):
+            finite = array[np.isfinite(array)] if array.dtype.kind == 'f' else array
+            default = (finite.min(), finite.max()) if finite.size else (0, 0)
+        vmin = default[0] if vmin is None else vmin
+        vmax = default[1] if vmax is None else vmax
+        if array.ndim == 3 and array.shape[2] in (2, 4):
+            array = np.concatenate([_window(array[..., :-1], vmin, vmax),
+                                    _window(array[..., -1:], *default)], axis=-1)
+        else:
+            array = _window(array, vmin, vmax)
+    if colormap is not None:
+        if array.ndim != 2:
+            raise ValueError("a colormap requires a grayscale image")
+        array = colormap_table(colormap)[array]
+    return np.ascontiguousarray(array)
+
+
+def _png_chunk(tag, data) -> bytes:
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff)
+
+
+def encode_png(pixels, compress_level=6) -> bytes:
+    """
+    PNG file of 8 bit pixels (see `array_pixels()`), written with zlib and the 'up' filter on all rows.
+
+    Args:
+        pixels (np.ndarray): uint8 array of shape (H, W) or (H, W, C) with C = 2, 3 or 4.
+        compress_level (int): zlib compression level 0 to 9.
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    height, width = pixels.shape[:2]
+    channels = 1 if pixels.ndim == 2 else pixels.shape[2]
+    rows = pixels.reshape(height, width * channels)
+    filtered = np.empty((height, width * channels + 1), dtype=np.uint8)
+    filtered[:, 0] = 2  # 'up': difference to the previous row (which is zero for the first row)
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+    color_type = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)),
+        _png_chunk(b'IDAT', zlib.compress(filtered, compress_level)),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+def encode_array(array, colormap=None, vmin=None, vmax=None, image_format=None, quality=85, time_budget=0.25):
+    """
+    Encode an image given as NumPy array for a data URI, see `array_pixels()`.
+
+    PNG (the default for `image_format` None) is written by `encode_png()`, all other formats
+    (see `encode_image()`) require Pillow.
+
+    Returns:
+        tuple[str, str]: Format and base64 encoded data.
+    """
+    pixels = array_pixels(array, colormap, vmin, vmax)
+    if image_format in (None, 'png'):
+        return 'png', base64.b64encode(encode_png(pixels)).decode()
+    from PIL import Image as PILImageModule
+    pil_image = PILImageModule.fromarray(pixels)
+    return encode_image(pil_image, 0, image_format, quality, time_budget)
+
+
+def array_digest(array) -> bytes:
+    """Hash of the dtype, shape and content of a NumPy array."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha1(f'{array.dtype.str} {array.shape}'.encode())
+    digest.update(memoryview(array).cast('B'))
+    return digest.digest()
+
+
+def _parameter_key(value):
+    """Hashable key of a parameter of `encode_array()`, e.g. a colormap given as array."""
+    if isinstance(value, np.ndarray):
+        return array_digest(value)
+    try:
+        hash(value)
+    except TypeError:
+        return ('id', id(value))
+    return value
+
+
+def display_size(image_size, width=None, height=None, scale=1.0, density=1.0):
+    """
+    Number of pixels (w, h) needed to show an image of `image_size` pixels at `width` x `height`
+    user units (its own size if None), with `scale` output pixels per user unit and `density`
+    image pixels per output pixel (e.g. 2 for HiDPI displays). At most `image_size`.
+    """
+    result = []
+    for pixels, shown in zip(image_size, (width, height)):
+        shown = pixels if shown is None else shown
+        result.append(int(min(pixels, max(1, math.ceil(shown * scale * density - 1e-9)))))
+    return tuple(result)
+
+
+def pyramid_factor(image_size, target_size) -> int:
+    """
+    Largest power of two by which an image can be reduced (see `PIL.Image.Image.reduce()`) while
+    keeping at least `target_size` pixels.
+    """
+    factor = 1
+    while all(-(-size // (2 * factor)) >= target for size, target in zip(image_size, target_size)):
+        factor *= 2
+    return factor
+
+
+class ImageCache:
+    """
+    Thread-safe LRU cache of encoded images with a memory cap.
+
+    Args:
+        max_bytes (int): Total size of the cached base64 payloads, least recently used ones are evicted first.
+            0 disables caching.
+        assume_immutable (bool): If True, the hash of an image is computed only once per image object,
+            i.e. in-place modifications (e.g. `paste()`) are not detected. Defaults to False.
+        max_derived_bytes (int): Total size of the downsampled images and tiles kept, see `derived()`.
+
+    Attributes:
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups which required encoding.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, assume_immutable=False, max_derived_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.assume_immutable = assume_immutable
+        self.max_derived_bytes = max_derived_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._digests = {}  # id of image -> (weak reference, digest), see `assume_immutable`
+        self._derived = OrderedDict()
+        self._derived_size = 0
+        self._lock = threading.Lock()
+
+    def digest(self, pil_image, remember=False) -> bytes:
+        """
+        `image_digest()`, memoized per image object if `assume_immutable` or `remember`
+        (always for derived images).
+        """
+        entry = self._digests.get(id(pil_image))
+        if entry is not None and entry[0]() is pil_image:
+            return entry[1]
+        digest = image_digest(pil_image)
+        if self.assume_immutable or remember:
+            self._remember_digest(pil_image, digest)
+        return digest
+
+    def _remember_digest(self, pil_image, digest):
+        key = id(pil_image)
+        self._digests[key] = (weakref.ref(pil_image, lambda _: self._digests.pop(key, None)), digest)
+
+    def derived(self, pil_image, operation, make, digest=None):
+        """
+        An image derived from `pil_image`, e.g. downsampled or cropped, cached by content and operation.
+
+        Derived images are never hashed: their digest follows from the one of `pil_image` and `operation`.
+
+        Args:
+            pil_image (PIL.Image.Image): The source image.
+            operation (tuple): Hashable description of the operation, e.g. ('reduce', 4).
+            make (Callable): Function computing the derived image from `pil_image`.
+            digest (bytes | None): The digest of `pil_image`, if already known.
+        """
+        if digest is None:
+            digest = self.digest(pil_image)
+        key = (digest, operation)
+        with self._lock:
+            result = self._derived.get(key)
+            if result is not None:
+                self._derived.move_to_end(key)
+                return result
+        result = make(pil_image)
+        self._remember_digest(result, hashlib.sha1(repr(key).encode()).digest())
+        size = result.width * result.height * len(result.getbands())
+        if size <= self.max_derived_bytes:
+            with self._lock:
+                self._derived[key] = result
+                self._derived_size += size
+                while self._derived_size > self.max_derived_bytes:
+                    _, evicted = self._derived.popitem(last=False)
+                    self._derived_size -= evicted.width * evicted.height * len(evicted.getbands())
+        return result
+
+    def downsampled(self, pil_image, size, pyramid=False):
+        """
+        `pil_image` reduced to `size` pixels, or if `pyramid`, to the smallest level of an image
+        pyramid (halving the resolution per level) with at least `size` pixels. Levels are shared
+        by all target sizes in between, i.e. zooming reuses them and their encoding.
+        """
+        if pyramid:
+            factor = pyramid_factor(pil_image.size, size)
+            if factor == 1:
+                return pil_image
+            return self.derived(pil_image, ('reduce', factor), lambda source: source.reduce(factor))
+        size = tuple(size)
+        if size == pil_image.size:
+            return pil_image
+        from PIL import Image as PILImageModule
+        return self.derived(pil_image, ('resize', size),
+                            lambda source: source.resize(size, PILImageModule.LANCZOS, reducing_gap=3.0))
+
+    def _lookup(self, key, encode):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = encode()
+        self.put(key, entry)
+        return entry
+
+    def encode(self, pil_image, sparse=0, image_format=None, quality=85, time_budget=0.25):
+        """
+        `encode_image()`, or its result for an image with the same content and parameters.
+        The `time_budget` of 'auto' is not part of the key.
+        """
+        encode = functools.partial(encode_image, pil_image, sparse, image_format, quality, time_budget)
+        if self.max_bytes <= 0:
+            return encode()
+        return self._lookup((self.digest(pil_image), sparse, image_format, quality), encode)
+
+    def encode_array(self, array, colormap=None, vmin=None, vmax=None, image_format=None, quality=85,
+                     time_budget=0.25):
+        """`encode_array()`, or its result for an array with the same content and parameters."""
+        encode = functools.partial(encode_array, array, colormap, vmin, vmax, image_format, quality, time_budget)
+        if self.max_bytes <= 0:
+            return encode()
+        params = (colormap, vmin, vmax, image_format, quality)
+        return self._lookup((array_digest(array),) + tuple(_parameter_key(value) for value in params), encode)
+
+    def _encode_job(self, job):
+        data, params = job
+        return (self.encode_array if isinstance(data, np.ndarray) else self.encode)(data, **params)
+
+    def encode_all(self, jobs, workers=None):
+        """
+        Encode many images in a pool of threads (PIL, zlib and hashlib release the GIL while encoding and hashing).
+
+        Args:
+            jobs (list[tuple[PIL.Image.Image | np.ndarray, dict]]): Images and the keyword arguments of
+                `encode()` (or `encode_array()` for NumPy arrays).
+            workers (int | None): Number of threads. Defaults to the default of `ThreadPoolExecutor`.
+
+        Returns:
+            list[tuple[str, str]]: Format and base64 encoded data of every job.
+        """
+        if len(jobs) < 2 or workers == 1:
+            return [self._encode_job(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self._encode_job, jobs))
+
+    def put(self, key, entry):
+        """Store an (img_format, data) entry and evict the least recently used ones beyond `max_bytes`."""
+        size = len(entry[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            self._derived.clear()
+            self._size = self._derived_size = 0
+            self.hits = self.misses = 0
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached payloads in bytes."""
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache used by `image()`
+image_cache = ImageCache()
@@ -0,0 +1,173 @@
+"""
+Opt-in profiling of rendering passes: time, call counts and emitted bytes per shape function and per Group.
+
+Created for svg_snip, see Composer.py
+
+Usage:
+    from svg_snip.Profiling import RenderProfile, profiling
+
+    profile = RenderProfile()
+    svg.render(P=P, profile=profile)
+    print(profile)                      # table sorted by time
+    profile.to_json('profile.json')
+
+    # or for all renderings in a block, e.g. of a CanvasWithOverlay
+    with profiling() as profile:
+        for P in matrices:
+            svg.render(P=P)
+"""
+
+import json
+import time
+import contextlib
+import contextvars
+from collections import namedtuple
+
+
+ProfileEntry = namedtuple('ProfileEntry', ['kind', 'name', 'calls', 'seconds', 'bytes'])
+ProfileEntry.__doc__ = """
+Statistics of a shape function (kind 'function') or of Group subtrees (kind 'group') with the same name.
+For groups, `seconds` and `bytes` include all descendants.
+"""
+
+
+_active_profile = contextvars.ContextVar('svg_snip_profile', default=None)
+
+
+def get_profile():
+    """The RenderProfile collecting statistics in the current context, or None, see `profiling()`."""
+    return _active_profile.get()
+
+
+@contextlib.contextmanager
+def profiling(profile=None):
+    """
+    Context manager collecting statistics of all renderings in its block.
+
+    Args:
+        profile (RenderProfile | None): Profile to add the statistics to. Defaults to a new one.
+
+    Yields:
+        RenderProfile: The profile.
+    """
+    if profile is None:
+        profile = RenderProfile()
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+def _function_name(func):
+    return getattr(func, '__qualname__', None) or getattr(func, '__name__', None) or type(func).__name__
+
+
+def _group_name(group):
+    if getattr(group, 'comment_str', None):
+        return f'{type(group).__name__} {group.comment_str!r}'
+    return type(group).__name__
+
+
+def _svg_bytes(result):
+    if isinstance(result, tuple):
+        result = result[0]
+    return len(result.encode('utf-8')) if isinstance(result, str) else 0
+
+
+class RenderProfile:
+    """
+    Statistics of the shape functions and Groups evaluated while the profile is active.
+
+    Time spent by shape functions covers only the calls themselves, i.e. not the evaluation of Groups
+    they return. Time spent by Groups covers the evaluation of the whole subtree, including all shape
+    functions and nested Groups, but not the time of the caller consuming the output. Children whose
+    output is reused (see `cache_size` and `Composer.render(incremental=True)`) are not counted.
+
+    Rendering with `workers` is not profiled, since the children are evaluated in other threads or processes.
+
+    Attributes:
+        functions (dict[str, list]): [calls, seconds, bytes] by qualified name of the shape function.
+        groups (dict[str, list]): [calls, seconds, bytes] by type and comment of the Group.
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self.groups = {}
+
+    def add_call(self, func, seconds, result):
+        """Record a call of a shape function and the svg code (or Group) it returned."""
+        self._add(self.functions, _function_name(func), seconds, _svg_bytes(result))
+
+    def timed_lines(self, group, lines):
+        """Yield the lines of a Group while recording the time spent producing them."""
+        seconds, size = 0.0, 0
+        start = time.perf_counter()
+        for line in lines:
+            seconds += time.perf_counter() - start
+            size += len(line.encode('utf-8'))
+            yield line
+            start = time.perf_counter()
+        seconds += time.perf_counter() - start
+        self._add(self.groups, _group_name(group), seconds, size)
+
+    @staticmethod
+    def _add(table, name, seconds, size):
+        entry = table.get(name)
+        if entry is None:
+            table[name] = [1, seconds, size]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += size
+
+    def clear(self):
+        self.functions.clear()
+        self.groups.clear()
+
+    def entries(self, sort='seconds'):
+        """
+        Statistics of all shape functions and Groups.
+
+        Args:
+            sort (str): Field of `ProfileEntry` to sort by, in descending order. Defaults to 'seconds'.
+
+        Returns:
+            list[ProfileEntry]
+        """
+        entries = [ProfileEntry('function', name, *entry) for name, entry in self.functions.items()]
+        entries += [ProfileEntry('group', name, *entry) for name, entry in self.groups.items()]
+        return sorted(entries, key=lambda entry: getattr(entry, sort), reverse=True)
+
+    def table(self, sort='seconds', limit=None) -> str:
+        """Format the statistics as a plain text table, see `entries()`."""
+        entries = self.entries(sort)[:limit]
+        width = max([len(entry.name) for entry in entries] + [4])
+        lines = [f"{'kind':<8} {'name':<{width}} {'calls':>8} {'time [ms]':>10} {'ms/call':>9} {'bytes':>10}"]
+        for entry in entries:
+            lines.append(f'{entry.kind:<8} {entry.name:<{width}} {entry.calls:>8} {entry.seconds * 1e3:>10.2f} '
+                         f'{entry.seconds * 1e3 / entry.calls:>9.4f} {entry.bytes:>10}')
+        return '\n'.join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            'functions': {name: dict(zip(('calls', 'seconds', 'bytes'), entry)) for name, entry in self.functions.items()},
+            'groups': {name: dict(zip(('calls', 'seconds', 'bytes'), entry)) for name, entry in self.groups.items()},
+        }
+
+    def to_json(self, path=None, **kwargs):
+        """
+        Export the statistics as JSON, see `to_dict()`.
+
+        Args:
+            path (str | None): File to write. If None, the JSON is returned as a string.
+            **kwargs: Passed on to `json.dumps()`, e.g. `indent=2`.
+        """
+        text = json.dumps(self.to_dict(), **kwargs)
+        if path is None:
+            return text
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def __str__(self):
+        return self.table()
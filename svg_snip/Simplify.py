@@ -0,0 +1,183 @@
+"""
+Simplification of polylines with many more points than pixels, e.g. sensor traces.
+
+Created for svg_snip, see Elements.py
+
+    - douglas_peucker: keeps the points deviating more than a tolerance from the simplified line (geometry).
+    - lttb: largest-triangle-three-buckets, keeps a fixed number of points (time series).
+    - simplify: either or both of the above.
+
+Usage:
+    from svg_snip.Elements import polyline
+    svg.add(polyline, points=trace, tolerance_px=0.5, stroke='red', fill='none')
+    svg.add(polyline, points=trace, max_points=800, stroke='red', fill='none')
+"""
+
+import re
+
+import numpy as np
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Ramer-Douglas-Peucker simplification of a polyline.
+
+    Args:
+        points (np.ndarray): (N, 2) vertices.
+        tolerance (float): Maximum distance of any removed vertex from the simplified polyline.
+
+    Returns:
+        np.ndarray: The vertices kept, including the first and last one.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n < 3:
+        return points
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        direction = end - start
+        length = np.hypot(*direction)
+        inner = points[first + 1:last] - start
+        if length > 0:
+            distances = np.abs(inner[:, 0] * direction[1] - inner[:, 1] * direction[0]) / length
+        else:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            index += first + 1
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return points[keep]
+
+
+def lttb(points, max_points):
+    """
+    Largest-triangle-three-buckets downsampling of a series of points ordered by x.
+
+    Args:
+        points (np.ndarray): (N, 2) vertices.
+        max_points (int): Number of vertices to keep (at least 3), including the first and last one.
+
+    Returns:
+        np.ndarray: The vertices kept.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    max_points = int(max_points)
+    if max_points >= n or max_points < 3:
+        return points
+    # Bucket boundaries of the n - 2 inner points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    means = np.add.reduceat(points[1:n - 1], edges[:-1] - 1) / np.diff(edges)[:, None]
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = points[0]
+    for bucket in range(max_points - 2):
+        candidates = points[edges[bucket]:edges[bucket + 1]]
+        following = means[bucket + 1] if bucket + 1 < len(means) else points[-1]
+        # Twice the area of the triangles (previous, candidate, following)
+        areas = np.abs((previous[0] - following[0]) * (candidates[:, 1] - previous[1])
+                       - (previous[0] - candidates[:, 0]) * (following[1] - previous[1]))
+        index = edges[bucket] + int(np.argmax(areas))
+        selected[bucket + 1] = index
+        previous = points[index]
+    return points[selected]
+
+
+def simplify(points, tolerance=None, max_points=None, closed=False):
+    """
+    Simplify a polyline (or polygon if `closed`) with `douglas_peucker()` and/or `lttb()`.
+
+    Args:
+        points (np.ndarray): (N, 2) vertices.
+        tolerance (float | None): See `douglas_peucker()`.
+        max_points (int | None): See `lttb()`, applied after `douglas_peucker()`.
+        closed (bool): Whether the last vertex connects back to the first one.
+
+    Returns:
+        np.ndarray: The vertices kept.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if closed and len(points) > 2:
+        points = np.concatenate([points, points[:1]])
+    if tolerance is not None:
+        points = douglas_peucker(points, tolerance)
+    if max_points is not None:
+        points = lttb(points, max_points + 1 if closed else max_points)
+    if closed and len(points) > 2:
+        points = points[:-1]
+    return points
+
+
+def parse_points(points):
+    """(N, 2) array of a `points` attribute given as string (e.g. '0,0 10,5') or array-like."""
+    if isinstance(points, str):
+        points = [float(v) for v in re.split(r'[\s,]+', points.strip()) if v]
+    return np.asarray(points, dtype=float).reshape(-1, 2)
+
+
+_PATH_COMMAND = re.compile(r'([MmLlHhVvZz])([^MmLlHhVvZz]*)')
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+def parse_line_path(d):
+    """
+    Subpaths of path data consisting of straight lines only (commands M, L, H, V and Z).
+
+    Returns:
+        list[tuple[np.ndarray, bool]] | None: (N, 2) vertices and whether the subpath is closed,
+            or None if the path contains curves or arcs.
+    """
+    d = d.strip()
+    if not d or re.search(r'[^MmLlHhVvZz\d\s,.eE+-]', d):
+        return None
+    subpaths = []
+    current = None
+    x = y = 0.0
+    start = (0.0, 0.0)
+    for command, args in _PATH_COMMAND.findall(d):
+        values = [float(v) for v in _NUMBER.findall(args)]
+        relative = command.islower()
+        c = command.upper()
+        if c == 'Z':
+            if current:
+                subpaths.append((np.array(current), True))
+            current = None
+            x, y = start
+            continue
+        if current is None and c != 'M':
+            if not subpaths:
+                return None  # path data starts with M
+            current = [(x, y)]
+            start = (x, y)
+        if c in 'ML':
+            if len(values) % 2:
+                return None
+            for i in range(0, len(values), 2):
+                if relative:
+                    x, y = x + values[i], y + values[i + 1]
+                else:
+                    x, y = values[i], values[i + 1]
+                if c == 'M' and i == 0:
+                    if current:
+                        subpaths.append((np.array(current), False))
+                    current = []
+                    start = (x, y)
+                current.append((x, y))
+        else:
+            for value in values:
+                if c == 'H':
+                    x = x + value if relative else value
+                else:
+                    y = y + value if relative else value
+                current.append((x, y))
+    if current:
+        subpaths.append((np.array(current), False))
+    return subpaths
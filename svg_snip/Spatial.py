@@ -0,0 +1,161 @@
+"""
+Spatial index over the elements of a Composer for hit-testing and region queries.
+
+Created for svg_snip, see Composer.py and Bounds.py
+
+The elements are sorted into a uniform grid by their bounding boxes, see `svg_snip.Bounds`.
+Children added to the composer or to any of its groups later on are indexed right away.
+
+Usage with CanvasWithOverlay:
+    svg = Composer((vis.w, vis.h))
+    ...
+    index = SpatialIndex(svg)
+
+    def handle_draw(vis):
+        hovered = index.query_point(*vis.mouse_state.pos(), tolerance=2)
+        ...
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from .Composer import Group
+from .Bounds import bounds, intersects, is_empty, parse_transform, transform_box
+
+
+class SpatialIndex:
+    """
+    Uniform grid of the bounding boxes of all shapes in a Group or Composer, including nested groups.
+
+    Query results are the children as returned by `Group.add()`, i.e. `(func, kwargs)` tuples, in the
+    order in which they were indexed. Shapes without known bounds (e.g. text, or groups with a
+    transform which cannot be parsed) are not indexed, but listed in `unindexed`.
+
+    Changes to existing children, or to `children` lists directly, require `rebuild()`.
+
+    Args:
+        group (Group): The scene, usually a Composer.
+        cell_size (float): Width and height of the grid cells in user units. Defaults to 64.
+        **override_kwargs: Override kwargs the scene is rendered with, if they affect the bounds.
+
+    Attributes:
+        unindexed (list[tuple]): Children whose bounds are not known.
+    """
+
+    # Elements covering more grid cells than this are kept in a list checked on every query
+    MAX_CELLS_PER_ITEM = 256
+
+    def __init__(self, group, cell_size=64.0, **override_kwargs):
+        self.group = group
+        self.cell_size = float(cell_size)
+        self.override_kwargs = override_kwargs
+        self._observers = []
+        self.rebuild()
+
+    def rebuild(self):
+        """Index all children of the scene from scratch."""
+        self.close()
+        self._items = []  # (child, box) by item id
+        self._cells = defaultdict(list)  # item ids by cell
+        self._large = []  # ids of items covering many cells
+        self.unindexed = []
+        _, other_kwargs = self.group._split_call_kwargs(self.override_kwargs)
+        self._watch(self.group, np.eye(3), other_kwargs)
+
+    def close(self):
+        """Stop following changes of the scene."""
+        for group, observer in self._observers:
+            group.remove_observer(observer)
+        self._observers = []
+
+    def _watch(self, group, M, other_kwargs):
+        """Index the children of a group placed with the transform M, and follow additions to it."""
+        def observer(group, child):
+            self._insert(child, M, other_kwargs)
+
+        for child in group.children:
+            self._insert(child, M, other_kwargs)
+        group.add_observer(observer)
+        self._observers.append((group, observer))
+
+    def _insert(self, child, M, other_kwargs):
+        func, child_kwargs = child
+        kwargs = {**child_kwargs, **other_kwargs}
+        if isinstance(func, Group):
+            T = parse_transform(kwargs.get('transform'))
+            if T is None:
+                self.unindexed.append(child)
+                return
+            _, group_kwargs = func._split_call_kwargs(kwargs)
+            self._watch(func, M @ T, group_kwargs)
+            return
+
+        box = bounds(func, kwargs)
+        if box is None:
+            self.unindexed.append(child)
+        elif not is_empty(box):
+            self._add(child, transform_box(M, box))
+
+    def _cell_range(self, box):
+        s = self.cell_size
+        return math.floor(box[0] / s), math.floor(box[1] / s), math.floor(box[2] / s), math.floor(box[3] / s)
+
+    def _add(self, child, box):
+        item = len(self._items)
+        self._items.append((child, box))
+        x0, y0, x1, y1 = self._cell_range(box)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.MAX_CELLS_PER_ITEM:
+            self._large.append(item)
+            return
+        for ix in range(x0, x1 + 1):
+            for iy in range(y0, y1 + 1):
+                self._cells[(ix, iy)].append(item)
+
+    def query_rect(self, xmin, ymin, xmax, ymax):
+        """
+        All indexed children whose bounding boxes intersect the rectangle.
+
+        Returns:
+            list[tuple]: The `(func, kwargs)` children in the order they were indexed.
+        """
+        box = (xmin, ymin, xmax, ymax)
+        x0, y0, x1, y1 = self._cell_range(box)
+        candidates = set(self._large)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            for (ix, iy), items in self._cells.items():
+                if x0 <= ix <= x1 and y0 <= iy <= y1:
+                    candidates.update(items)
+        else:
+            for ix in range(x0, x1 + 1):
+                for iy in range(y0, y1 + 1):
+                    candidates.update(self._cells.get((ix, iy), ()))
+
+        result, seen = [], set()
+        for item in sorted(candidates):
+            child, child_box = self._items[item]
+            if id(child) not in seen and intersects(child_box, box):
+                seen.add(id(child))
+                result.append(child)
+        return result
+
+    def query_point(self, x, y, tolerance=0.0):
+        """
+        All indexed children whose bounding boxes contain the point (x, y), widened by `tolerance`.
+
+        Returns:
+            list[tuple]: The `(func, kwargs)` children in the order they were indexed,
+                i.e. usually the topmost last.
+        """
+        return self.query_rect(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+
+    def bbox(self, child):
+        """Bounding box of an indexed child in the coordinates of the scene (first placement)."""
+        for indexed, box in self._items:
+            if indexed is child:
+                return box
+        return None
+
+    def __len__(self):
+        return len(self._items)
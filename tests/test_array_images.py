@@ -0,0 +1,58 @@
+"""
+Test embedding NumPy arrays as images: windowing, colormaps and the built-in PNG writer.
+"""
+
+import base64
+import io
+import re
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer, image
+from svg_snip.Images import array_pixels, colormap_table, encode_png, image_cache
+
+
+def png_payload(svg_code):
+    return base64.b64decode(re.search(r'data:image/png;base64,([^"]+)"', svg_code).group(1))
+
+
+def test_windowing_and_colormap():
+    values = np.array([[0.0, 0.5], [1.0, np.nan]])
+    assert array_pixels(values).tolist() == [[0, 128], [255, 0]]
+    assert array_pixels(values, vmin=0.5, vmax=1.0).tolist() == [[0, 0], [255, 0]]
+    assert array_pixels(np.array([[0, 4095]], dtype=np.uint16)).tolist() == [[0, 255]]
+    lut = [[0, 0, 255], [255, 0, 0]]  # blue to red
+    assert array_pixels(values[:1], colormap=lut).tolist() == [[[0, 0, 255], [255, 0, 0]]]
+    assert colormap_table('gray').shape == (256, 3)
+    with pytest.raises(ValueError):
+        array_pixels(np.zeros((2, 2, 5)))
+
+
+def test_color_images_are_not_stretched():
+    assert array_pixels(np.full((2, 2, 3), 0.5)).tolist() == [[[128] * 3] * 2] * 2
+    rgba = np.array([[[0.2, 0.4, 0.6, 0.5]]])
+    assert array_pixels(rgba).tolist() == [[[51, 102, 153, 128]]]
+    assert array_pixels(rgba, vmin=0.2, vmax=0.6).tolist() == [[[0, 128, 255, 128]]]
+    assert array_pixels(np.full((1, 1, 3), 4095, dtype=np.uint16)).tolist() == [[[16] * 3]]
+
+
+@pytest.mark.parametrize('shape', [(5, 7), (5, 7, 2), (5, 7, 3), (5, 7, 4)])
+def test_png_writer_round_trip(shape):
+    Image = pytest.importorskip('PIL.Image')
+    pixels = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    decoded = np.asarray(Image.open(io.BytesIO(encode_png(pixels))))
+    assert np.array_equal(decoded, pixels)
+
+
+def test_image_accepts_arrays():
+    image_cache.clear()
+    heatmap = np.linspace(0, 1, 64 * 32).reshape(32, 64)
+    svg = Composer(heatmap)
+    assert svg.image_size == (64, 32)
+    assert png_payload(svg.render()) == encode_png(array_pixels(heatmap))
+    assert png_payload(svg.render()).startswith(b'\x89PNG')
+    assert image_cache.hits == 1
+    code = image(heatmap, colormap=[[0, 0, 0], [255, 255, 0]], vmin=0, vmax=2)
+    assert png_payload(code) == encode_png(array_pixels(heatmap, [[0, 0, 0], [255, 255, 0]], 0, 2))
+    assert Composer((100, 100)).encode_images() == 0
@@ -0,0 +1,32 @@
+"""
+Test the batch element functions (circles, lines, texts, ...) which take arrays of values.
+"""
+
+import numpy as np
+
+from svg_snip.Composer import Composer
+from svg_snip.Elements import circle, circles, text, texts
+
+
+def test_batch_matches_single_elements():
+    """Each generated line equals the output of the single-element function."""
+    cx = np.array([1.0, 2.5, 3.25])
+    cy = [4, 5, 6]
+    fills = ['red', 'green', 'blue']
+
+    batch = circles(cx=cx, cy=cy, r=2, fill=fills, style='opacity: 50%')
+    expected = [circle(cx=x, cy=y, r=2, fill=f, style='opacity: 50%') for x, y, f in zip(cx, cy, fills)]
+    assert batch.split('\n') == expected
+
+    labels = texts(x=[1, 2], y=3, content=['a', 'b'], font_size=10)
+    assert labels.split('\n') == [text(x=1, y=3, content='a', font_size=10),
+                                  text(x=2, y=3, content='b', font_size=10)]
+    assert circles(cx=np.array([]), cy=np.array([])) == ''
+
+
+def test_batch_is_a_single_child():
+    """A batch is added like any shape function and indented line by line."""
+    svg = Composer((100, 100))
+    svg.add(circles, cx=np.arange(3), cy=np.arange(3), r=1)
+    assert len(svg.children) == 1
+    assert svg.render().count('\n  <circle ') == 3
@@ -0,0 +1,52 @@
+"""
+Test the bounding boxes of shapes and the culling of children outside of the viewBox.
+"""
+
+import numpy as np
+
+from svg_snip.Bounds import bounds, parse_transform
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import arrow, circle, cross, line, polyline, rect, text
+
+
+def test_bounds_of_elements_and_transforms():
+    assert bounds(circle, dict(cx=10, cy=10, r=2, stroke_width=0)) == (8, 8, 12, 12)
+    assert bounds(rect, dict(x=0, y=0, width=4, height=2, stroke_width=0, transform='translate(5 1)')) \
+        == (5, 1, 9, 3)
+    assert bounds(polyline, dict(points='0,0 3,4 -1,2', stroke_width=0)) == (-1, 0, 3, 4)
+    assert bounds(text, dict(x=0, y=0, content='?')) is None
+    assert bounds(rect, dict(x=0, y=0, width=1, height=1, transform='perspective(3)')) is None
+    M = parse_transform('translate(10,20) scale(2) rotate(90)')
+    assert np.allclose(M @ [1, 0, 1], [10, 22, 1])
+
+
+def test_cull_drops_invisible_children_and_groups():
+    svg = Composer((100, 100))
+    svg.add(circle, cx=50, cy=50, r=5, fill='red')
+    svg.add(circle, cx=500, cy=50, r=5, fill='blue')
+    svg.add(line, x1=-50, y1=-50, x2=150, y2=150, stroke='green')  # crosses the viewport
+    svg.add(arrow, x1=-30, y1=50, x2=-5, y2=50)  # only the marker might be visible
+    svg.add(cross, x=-20, y=-20, size=4)
+    svg.add(text, x=-1000, y=-1000, content='unknown bounds')
+
+    far = Group('far away')
+    far.add(rect, x=0, y=0, width=10, height=10, fill='yellow')
+    svg.add(far, transform='translate(300 300)')
+
+    shifted = Group('shifted')
+    shifted.add(rect, x=-310, y=10, width=10, height=10, fill='orange')  # visible after the translation
+    shifted.add(rect, x=0, y=10, width=10, height=10, fill='purple')  # invisible after the translation
+    svg.add(shifted, transform='translate(300 0)')
+
+    unknown = Group()
+    unknown.add(circle, cx=-100, cy=-100, r=1, fill='gray')
+    svg.add(unknown, transform='perspective(2)')  # not parseable, so the subtree is kept
+
+    full = svg.render()
+    culled = svg.render(cull=True)
+    for kept in ('red', 'green', 'arrow-small', 'unknown bounds', 'orange', 'gray'):
+        assert kept in culled
+    for dropped in ('blue', 'cross', 'far away', 'yellow', 'purple'):
+        assert dropped in full and dropped not in culled
+    streamed = ''.join(svg.iter_render(cull=True))
+    assert sorted(streamed.split('\n')) == sorted(culled.split('\n'))
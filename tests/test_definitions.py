@@ -0,0 +1,76 @@
+"""
+Test that only referenced definitions are emitted and that conflicting ids are detected.
+"""
+
+import functools
+
+import pytest
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import arrow, cross, star
+import svg_snip.Elements3D as e3d
+
+
+def test_only_referenced_definitions_are_emitted():
+    svg = Composer((100, 100))
+    svg.add(arrow, x1=0, y1=0, x2=10, y2=10, head='arrow-large', tail='circle')
+    svg.add(star, x=5, y=5)
+    rendered = svg.render()
+
+    assert 'id="arrow-large"' in rendered
+    assert 'id="circle"' in rendered
+    assert 'id="star-shape"' in rendered
+    assert 'id="arrow-small"' not in rendered
+    assert 'id="star"' not in rendered
+    assert 'id="cross"' not in rendered
+
+
+def test_definitions_of_wrapped_functions():
+    """Functions calling declared functions (e.g. Elements3D.arrow) also get their definitions."""
+    svg = Composer((100, 100))
+    svg.add(e3d.arrow, P=[[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1]], X1=[0, 0, 0, 1], X2=[9, 9, 0, 1])
+    assert 'id="arrow-small"' in svg.render()
+
+
+@pytest.fixture
+def declared():
+    """Functions declared by a test, removed from the registry afterwards."""
+    functions = []
+    yield functions
+    for func in functions:
+        Group.declared_shapes.pop(func, None)
+
+
+def test_conflicting_ids_are_rejected(declared):
+    def my_marker(**kwargs):
+        return ''
+
+    declared.append(my_marker)
+    Group.declare(my_marker, {'cross': Group.declared_shapes[cross]['cross']})
+    with pytest.raises(ValueError):
+        Group.declare(my_marker, {'cross': '<g id="cross"/>'})
+
+
+def test_distinct_functions_with_the_same_name_keep_their_definitions(declared):
+    markers = [lambda **kwargs: '', lambda **kwargs: '',
+               functools.partial(star, size=2), functools.partial(star, size=3)]
+    declared.extend(markers)
+    for number, marker in enumerate(markers):
+        Group.declare(marker, {f'test-marker-{number}': f'<g id="test-marker-{number}"/>'})
+    assert all(marker in Group.declared_shapes for marker in markers)
+    with pytest.raises(ValueError, match='functools.partial'):
+        Group.declare(markers[3], {'test-marker-2': '<g id="test-marker-2" fill="red"/>'})
+
+
+def test_definitions_referenced_by_definitions_are_emitted(declared):
+    def hatched(**kwargs):
+        return '<rect width="10" height="10" fill="url(#hatch)" />'
+
+    declared.append(hatched)
+    Group.declare(hatched, {
+        'hatch-line': '<line id="hatch-line" x2="4" stroke="black"/>',
+        'hatch': '<pattern id="hatch" width="4" height="4"><use href="#hatch-line"/></pattern>'})
+    svg = Composer((10, 10))
+    svg.add(hatched)
+    rendered = svg.render()
+    assert 'id="hatch"' in rendered and 'id="hatch-line"' in rendered
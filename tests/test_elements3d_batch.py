@@ -0,0 +1,31 @@
+"""
+Test the batched 3D points, lines, arrows and texts against the single elements.
+"""
+
+import numpy as np
+
+from svg_snip.Composer import Composer
+import svg_snip.Elements3D as Elements3D
+
+P = np.array([[800.0, 0, 400, 0], [0, 800, 300, 0], [0, 0, 1, 400]])
+
+
+def test_batches_match_single_elements():
+    rng = np.random.default_rng(0)
+    X1s, X2s = rng.uniform(-100, 100, size=(2, 20, 3))
+    homogeneous = np.c_[X1s, np.ones(len(X1s))]
+    assert Elements3D.points(P, X1s, r=2).split('\n') == [Elements3D.point(P, X, r=2) for X in homogeneous]
+    assert Elements3D.points(P, homogeneous) == Elements3D.points(P, X1s)
+    assert Elements3D.lines(P, X1s, X2s).split('\n') == \
+        [Elements3D.line(P, [*a, 1], [*b, 1]) for a, b in zip(X1s, X2s)]
+    labels = [f'L{i}' for i in range(20)]
+    assert Elements3D.texts(P, X1s, labels, font_size=8).split('\n') == \
+        [Elements3D.text(P, [*X, 1], label, font_size=8) for X, label in zip(X1s, labels)]
+
+
+def test_arrows_use_shared_markers():
+    svg = Composer((800, 600))
+    svg.add(Elements3D.arrows, X1s=np.zeros((5, 3)), X2s=np.eye(5, 3) * 50, head='arrow-large', tail='circle')
+    output = svg.render(P=P)
+    assert output.count('marker-start="url(#circle)" marker-end="url(#arrow-large)"') == 5
+    assert '<marker id="arrow-large"' in output and '<marker id="circle"' in output
@@ -0,0 +1,33 @@
+"""
+Test the vectorized icosphere meshes and the spheres drawn from them.
+"""
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer
+import svg_snip.Elements3D as Elements3D
+
+
+@pytest.mark.parametrize('level', [0, 1, 2, 4])
+def test_icosphere_mesh_is_closed_and_shares_vertices(level):
+    verts, faces = Elements3D.icosphere(level)
+    assert verts.shape == (10 * 4**level + 2, 3) and faces.shape == (20 * 4**level, 3)
+    assert np.allclose(np.linalg.norm(verts, axis=1), 1)
+    assert len(np.unique(np.round(verts, 9), axis=0)) == len(verts)
+    # Every edge is shared by exactly two faces, in opposite directions
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    assert len({tuple(e) for e in edges.tolist()}) == len(edges)
+    assert len({tuple(sorted(e)) for e in edges.tolist()}) == len(edges) // 2
+    assert Elements3D.icosphere(level)[0] is verts  # cached
+
+
+def test_sphere_draws_front_faces_of_the_requested_level():
+    P = np.array([[800.0, 0, 400, 0], [0, 800, 300, 0], [0, 0, 1, 400]])
+    svg = Composer((800, 600))
+    svg.add(Elements3D.sphere, center=(0, 0, 0, 1), radius=50, subdivisions=3, stroke='black')
+    output = svg.render(P=P)
+    assert 1280 * 0.4 < output.count('<polygon') < 1280 * 0.6
+    assert output.count('stroke="black"') == output.count('<polygon')
+    with pytest.raises(ValueError):
+        Elements3D.icosphere(-1)
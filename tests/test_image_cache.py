@@ -0,0 +1,62 @@
+"""
+Test the cache of encoded images keyed by content and encoding parameters.
+"""
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer, image
+from svg_snip.Images import ImageCache, encode_image, image_cache
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def gradient(width=64, height=48, offset=0):
+    y, x = np.mgrid[0:height, 0:width]
+    return Image.fromarray(np.stack([x * 4, y * 5, (x + y + offset) % 256], axis=-1).astype(np.uint8))
+
+
+def test_rendering_reuses_encoded_background():
+    image_cache.clear()
+    background = gradient()
+    svg = Composer(background)
+    first = svg.render()
+    svg.render(precision=1)
+    assert image_cache.hits == 1
+    assert image_cache.misses == 1
+    background.putpixel((0, 0), (255, 255, 255))  # modified content is encoded again
+    assert svg.render() != first
+    assert image_cache.misses == 2
+
+
+def test_cache_key_includes_parameters_and_matches_encoding():
+    image_cache.clear()
+    picture = gradient()
+    assert image(picture, sparse=0) == image(picture.copy(), sparse=0)
+    assert 'image/png' in image(picture, sparse=16)
+    assert image_cache.misses == 2 and image_cache.hits == 1
+    assert image_cache.encode(picture, 16) == encode_image(picture, 16)
+
+
+def test_memory_cap_evicts_least_recently_used():
+    images = [gradient(offset=i) for i in range(3)]
+    size = len(encode_image(images[0], 1)[1])
+    cache = ImageCache(max_bytes=2 * size + size // 2)
+    for picture in images[:2]:
+        cache.encode(picture, 1)
+    cache.encode(images[0], 1)  # most recently used
+    cache.encode(images[2], 1)
+    assert len(cache) == 2 and cache.size <= cache.max_bytes
+    cache.encode(images[0], 1)
+    assert cache.hits == 2
+    cache.encode(images[1], 1)
+    assert cache.misses == 4
+
+
+def test_assume_immutable_hashes_once_per_image():
+    cache = ImageCache(assume_immutable=True)
+    picture = gradient()
+    first = cache.encode(picture)
+    picture.putpixel((0, 0), (255, 255, 255))  # not detected
+    assert cache.encode(picture) is first
+    assert cache.encode(picture.copy()) is not first
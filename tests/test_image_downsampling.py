@@ -0,0 +1,81 @@
+"""
+Test embedding images at display resolution, image pyramids and tiled images.
+"""
+
+import base64
+import io
+import re
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer, image, tiled_image
+from svg_snip.Images import display_size, image_cache, pyramid_factor
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def embedded_sizes(svg_code):
+    return [Image.open(io.BytesIO(base64.b64decode(data))).size
+            for data in re.findall(r'base64,([^"]+)"', svg_code)]
+
+
+def scan(width=1000, height=600):
+    y, x = np.mgrid[0:height, 0:width]
+    return Image.fromarray(np.stack([x % 256, y % 256, (x // 7 + y // 5) % 256], axis=-1).astype(np.uint8))
+
+
+def test_display_size_and_pyramid_levels():
+    assert display_size((1000, 600), scale=0.25) == (250, 150)
+    assert display_size((1000, 600), 100, 60, scale=2, density=2) == (400, 240)
+    assert display_size((1000, 600), scale=4) == (1000, 600)
+    assert pyramid_factor((1000, 600), (250, 150)) == 4
+    assert pyramid_factor((1000, 600), (251, 150)) == 2
+
+
+def test_background_is_embedded_at_display_resolution():
+    image_cache.clear()
+    svg = Composer(scan(), downsample=True)
+    svg.scale = 0.2
+    output = svg.render()
+    assert embedded_sizes(output) == [(200, 120)]
+    assert 'width="1000.00px"' in output and 'height="600.00px"' in output
+    svg.scale = 0.19
+    pyramid = image(scan(), downsample=True, pyramid=True, composer=svg)
+    assert embedded_sizes(pyramid) == [(250, 150)]
+    assert embedded_sizes(image(scan(), composer=svg)) == [(1000, 600)]
+
+
+def test_tiles_outside_of_viewport_are_not_encoded():
+    image_cache.clear()
+    svg = Composer((400, 300))
+    svg.add(tiled_image, data=scan(), x=-200, tile_size=256)
+    assert embedded_sizes(svg.render()) == [(w, h) for h in (256, 256, 88) for w in (256, 256, 256, 232)]
+    image_cache.clear()
+    culled = svg.render(cull=True)
+    assert embedded_sizes(culled) == [(256, 256)] * 6  # columns from x=-200 to 568, rows from y=0 to 512
+    assert image_cache.misses == 6
+    assert '<image x="56.00px" y="256.00px" height="256.00px" width="256.00px"' in culled
+
+
+def test_tiled_image_is_hashed_once(monkeypatch):
+    import svg_snip.Images as Images
+
+    image_cache.clear()
+    hashed = []
+    monkeypatch.setattr(Images, 'image_digest', lambda pil_image: hashed.append(pil_image) or b'digest')
+    svg = Composer((400, 300))
+    svg.add(tiled_image, data=scan(), tile_size=256)
+    first = svg.render()
+    assert svg.render() == first
+    assert len(hashed) == 1
+    image_cache.clear()
+
+
+def test_tiles_are_encoded_ahead_of_rendering():
+    image_cache.clear()
+    svg = Composer(scan(), tile_size=256)
+    assert svg.encode_images(workers=2) == 12
+    assert image_cache.misses == 12
+    svg.render()
+    assert image_cache.misses == 12 and image_cache.hits == 12
@@ -0,0 +1,53 @@
+"""
+Test the automatic image format and the encoding of images in a pool of threads.
+"""
+
+import base64
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer, Group, image
+from svg_snip.Images import encode_image, image_cache
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def noise(seed, size=(48, 64)):
+    return Image.fromarray(np.random.default_rng(seed).integers(0, 256, (*size, 3), dtype=np.uint8))
+
+
+def test_auto_format_keeps_the_smallest_encoding():
+    flat = Image.new('RGB', (64, 48), (10, 200, 30))
+    flat.paste((255, 0, 0), (10, 10, 30, 30))
+    img_format, data = encode_image(flat, image_format='auto')
+    assert img_format == 'png'
+    assert len(data) < len(encode_image(flat)[1])  # smaller than the default JPEG
+    photo = Image.fromarray(np.random.default_rng(0).normal(128, 20, (96, 128, 3)).clip(0, 255).astype(np.uint8))
+    img_format, data = encode_image(photo, image_format='auto')
+    assert img_format in ('jpeg', 'webp')
+    assert len(data) <= len(encode_image(photo, image_format='png')[1])
+    assert base64.b64decode(data)
+
+
+def test_auto_format_keeps_alpha():
+    rgba = noise(1).convert('RGBA')
+    assert encode_image(rgba, image_format='auto')[0] in ('png', 'webp')
+    with pytest.raises(ValueError):
+        encode_image(rgba, image_format='gif')
+
+
+def test_images_are_encoded_in_threads_before_rendering():
+    image_cache.clear()
+    svg = Composer((200, 200))
+    thumbnails = Group()
+    for i in range(8):
+        thumbnails.add(image, data=noise(i), x=i * 20, width=16, height=12)
+    svg.add(thumbnails, transform='translate(0 10)')
+    serial = svg.render()
+    image_cache.clear()
+    assert svg.encode_images(workers=4, image_format='auto') == 8
+    assert image_cache.misses == 8
+    assert svg.render(image_workers=4) == serial
+    assert image_cache.misses == 16 and image_cache.hits == 8
+    assert 'image/png' in svg.render(image_format='png')
@@ -0,0 +1,93 @@
+"""
+Test that repeated groups and shapes are rendered once and referenced by <use> elements.
+"""
+
+import re
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import arrow, circle, polygon, text
+
+
+def make_scene():
+    glyph = Group()
+    glyph.add(circle, cx=0, cy=0, r=5, fill='red')
+    glyph.add(arrow, x1=0, y1=0, x2=10, y2=10, head='circle')
+    glyph.add(text, x=0, y=-8, content='glyph', font_size=4)
+
+    svg = Composer((500, 500))
+    for i in range(20):
+        svg.add(glyph, transform=f'translate({20 * i} {10 * i})', opacity=0.5)
+    star = '0,-10 2.76,-3.5 9.51,-3.5 4.63,1.5 7.39,8 0,4.5 -7.39,8 -4.63,1.5 -9.51,-3.5 -2.76,-3.5'
+    for i in range(10):
+        svg.add(polygon, points=star, fill='gold', stroke='black', transform=f'translate({30 * i} 400)')
+    svg.add(circle, cx=1, cy=2, r=3)
+    return svg
+
+
+def test_repeated_groups_and_shapes_become_uses():
+    svg = make_scene()
+    plain = svg.render()
+    instanced = svg.render(instancing=True)
+
+    assert len(instanced) < len(plain) / 2
+    ids = re.findall(r'<g id="(instance-[0-9a-f]+)">', instanced)
+    assert len(ids) == 2
+    assert instanced.count('<use href="#') == 30
+    assert '<use href="#%s" transform="translate(20 10)" opacity="0.5"/>' % ids[0] in instanced
+    assert instanced.count('glyph</text>') == 1
+    # The marker used inside the instance is still declared
+    assert '<marker id="circle"' in instanced
+    # Content rendered once is not touched
+    assert '<circle cx="1.00" cy="2.00" r="3.00" />' in instanced
+    # Instance ids are stable, and the output is the same as a stream
+    assert svg.render(instancing=True) == instanced
+    streamed = ''.join(svg.iter_render(instancing=True))
+    assert sorted(streamed.split('\n')) == sorted(instanced.split('\n'))
+
+
+def test_cached_groups_can_be_instanced():
+    cached = Group(cache_size=4)
+    cached.add(circle, cx=0, cy=0, r=5)
+    cached.add(text, x=0, y=0, content='a rather long label of a cached group')
+    outer = Group()
+    outer.add(cached)
+    svg = Composer((100, 100))
+    for i in range(5):
+        svg.add(cached, transform=f'translate({i} 0)')
+        svg.add(outer, transform=f'translate(0 {i})')
+    instanced = svg.render(instancing=True)
+    assert instanced.count('<use href="#') == 11  # including the one in the instance of outer
+    assert instanced.count('cached group</text>') == 1
+    assert svg.render(instancing=True) == instanced
+    assert '\n'.join(sorted(''.join(svg.iter_render(instancing=True)).split('\n'))) \
+        == '\n'.join(sorted(instanced.split('\n')))
+
+
+def test_small_repeats_are_not_instanced():
+    svg = Composer((100, 100))
+    for i in range(3):
+        svg.add(circle, cx=1, cy=1, r=1, transform=f'translate({i})')
+    assert svg.render(instancing=True) == svg.render()
+
+
+def test_shapes_differing_by_position_share_an_instance():
+    from svg_snip.Elements import star
+    svg = Composer((500, 500))
+    for i in range(10):
+        svg.add(star, x=10 * i + 0.5, y=20, size=8, fill='gold', stroke='black', stroke_width=0.5)
+    plain = svg.render()
+    instanced = svg.render(instancing=True)
+    assert len(instanced) < len(plain)
+    assert instanced.count('<use href="#instance-0" transform="translate(') == 10
+    assert '<use href="#instance-0" transform="translate(30.50 20.00)"/>' in instanced
+
+
+def test_instance_ids_do_not_depend_on_the_process():
+    import os
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = 'import tests.test_instancing as t; print(t.make_scene().render(instancing=True))'
+    outputs = {subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=root,
+                              env={'PYTHONHASHSEED': seed, 'PATH': ''}).stdout for seed in ('1', '2')}
+    assert len(outputs) == 1
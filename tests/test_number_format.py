@@ -0,0 +1,78 @@
+"""
+Test the render-level number precision and the minified output mode.
+"""
+
+import numpy as np
+
+from svg_snip.Composer import Composer, Group, format_number, number_format, minify_path_data
+from svg_snip.Elements import arrow, circle, circles, path, text
+
+
+def make_scene():
+    svg = Composer((100, 100))
+    svg.add(circle, cx=1.25, cy=0, r=10.5, fill='red')
+    svg.add(path, d='M 10.00,-5.50 L 3.00 4.00 L 0.50 0.25 z')
+    group = Group()
+    group.add(text, x=0.5, y=1, content='label')
+    group.add(arrow, x1=0, y1=0, x2=3, y2=4)
+    svg.add(group, transform='scale(2)')
+    svg.add(circles, cx=np.array([1.5, 2.0]), cy=0, r=1)
+    return svg
+
+
+def test_precision():
+    rendered = make_scene().render(precision=3)
+    assert '<circle cx="1.250" cy="0.000" r="10.500" fill="red" />' in rendered
+    assert '<circle cx="2.000" cy="0.000" r="1.000" />' in rendered
+    assert 'cx="1.25"' in make_scene().render()
+
+
+def test_minify():
+    svg = make_scene()
+    minified = svg.render(minify=True)
+    assert '\n' not in minified and '  ' not in minified
+    assert '<circle cx="1.25" cy="0" r="10.5" fill="red"/>' in minified
+    assert '<path d="M10-5.5L3 4L.5.25z"/>' in minified
+    assert '<text x=".5" y="1">label</text>' in minified
+    assert '<circle cx="2" cy="0" r="1"/>' in minified
+    assert '<defs><marker id="arrow-small"' in minified
+    assert len(minified) < 0.85 * len(svg.render())
+    assert ''.join(svg.iter_render(minify=True)).replace('</svg>', '') \
+        .startswith(minified.split('<defs>')[0])
+
+
+def test_number_format_context():
+    with number_format(precision=1, minify=True):
+        assert circle(cx=1.26, cy=-0.01, r=2) == '<circle cx="1.3" cy="0" r="2" />'
+        assert minify_path_data('M 0.50,0.50 L -1.00 .5') == 'M.5.5L-1 .5'
+    assert circle(cx=1.26) == '<circle cx="1.26" />'
+
+
+def test_format_points_matches_format_number():
+    from svg_snip.Composer import format_points
+    from svg_snip.Elements import polyline
+
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(0, 10, 200), rng.normal(0, 0.01, 200), [0, -0.0, 0.5, -0.5, 100, -0.004]])
+    for precision in range(4):
+        for minify in (False, True):
+            with number_format(precision, minify):
+                expected = ' '.join(f'{format_number(x)},{format_number(y)}' for x, y in values.reshape(-1, 2))
+                assert format_points(values) == expected
+    assert polyline(points=np.array([[0, 1], [2.5, 3]])) == '<polyline points="0.00,1.00 2.50,3.00" />'
+
+
+def test_minify_keeps_text_content():
+    svg = Composer((10, 10))
+    svg.add(text, x=0, y=5, content='<tspan>a</tspan> <tspan>b  c</tspan>')
+    minified = svg.render(minify=True)
+    assert '<tspan>a</tspan> <tspan>b  c</tspan></text>' in minified
+
+
+def test_marker_scale_keeps_extra_digits():
+    from svg_snip.Elements import cross, heart, star
+
+    with number_format(precision=0):
+        assert 'scale(0.67)' in cross(size=4)
+        assert 'scale(0.40)' in star(size=4)
+        assert 'scale(0.40)' in heart(size=4)
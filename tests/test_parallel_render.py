@@ -0,0 +1,54 @@
+"""
+Test rendering of the children in a pool of workers (Composer.render(workers=...)).
+"""
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import arrow, circle, rect
+import svg_snip.Elements3D as e3d
+
+
+def make_scene():
+    svg = Composer((300, 300))
+    svg.add(rect, x=0, y=0, width=300, height=300, fill='white')
+    for i in range(40):
+        svg.add(circle, cx=i, cy=i, r=2)
+    large = Group()
+    for i in range(100):
+        large.add(arrow, x1=i, y1=0, x2=i, y2=10, head='circle')
+    svg.add(large, transform='translate(1,2)')
+    svg.add(e3d.wire_cube, min=[-50, -50, -50], max=[50, 50, 50])
+    return svg
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parallel_render_matches_render(executor):
+    """Merged output and <defs> are identical to a sequential render()."""
+    svg = make_scene()
+    P = np.array([[200., 0, 150, 0], [0, 200, 150, 0], [0, 0, 1, 300]])
+    expected = svg.render(P=P)
+    assert svg.render(workers=3, executor=executor, P=P) == expected
+    assert svg.render(workers=3, executor=executor, pretty=False, P=P) == svg.render(pretty=False, P=P)
+    assert 'id="circle"' in expected
+    svg.close()
+
+
+def test_invalid_executor():
+    with pytest.raises(ValueError):
+        make_scene().render(workers=2, executor='gpu', P=np.eye(3, 4))
+
+
+def test_pool_is_kept_until_closed():
+    svg = make_scene()
+    P = np.array([[200., 0, 150, 0], [0, 200, 150, 0], [0, 0, 1, 300]])
+    expected = svg.render(P=P)
+    assert svg.render(workers=2, executor='thread', P=P) == expected
+    pool = svg._pool[1]
+    assert svg.render(workers=2, executor='thread', P=P) == expected
+    assert svg._pool[1] is pool
+    assert svg.render(workers=3, executor='thread', P=P) == expected
+    assert svg._pool[1] is not pool
+    svg.close()
+    assert svg._pool is None
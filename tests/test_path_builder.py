@@ -0,0 +1,66 @@
+"""
+Test the array-backed Path builder and its relative, elided path data.
+"""
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer, number_format
+from svg_snip.Elements import Path
+from svg_snip.Simplify import parse_line_path
+
+
+def test_path_data_is_relative_and_elided():
+    outline = Path(fill='none')
+    outline.move_to(10, 10).line_to(20, 10).line_to(20, 30).line_to(25, 35).line_to(30, 40)
+    outline.cubic_to(35, 40, 35, 50, 30, 50).arc_to(5, 5, 0, False, True, 20, 50).close()
+    assert outline.d() == ('m10.00,10.00h10.00v20.00l5.00,5.00 5.00,5.00c5.00,0.00 5.00,10.00 0.00,10.00'
+                           'a5.00 5.00 0.00 0 1 -10.00,0.00z')
+    with number_format(precision=1, minify=True):
+        assert outline() == '<path d="m10 10h10v20l5 5 5 5c5 0 5 10 0 10a5 5 0 0 1-10 0z" fill="none" />'
+
+
+def test_bulk_append_does_not_drift():
+    rng = np.random.default_rng(0)
+    points = np.cumsum(rng.uniform(-1, 1, size=(10000, 2)), axis=0)
+    trace = Path().polyline(points, closed=True)
+    assert len(trace) == 10001
+    (parsed, closed), = parse_line_path(trace.d())
+    assert closed
+    assert np.abs(parsed - points).max() <= 0.005 + 1e-9
+
+
+def test_path_in_group_follows_modifications():
+    trace = Path(stroke='red')
+    trace.move_to(0, 0).lines_to([[10, 10], [20, 0]])
+    svg = Composer((100, 100))
+    svg.add(trace, stroke_width=2)
+    assert '<path d="m0.00,0.00 10.00,10.00 10.00,-10.00" stroke="red" stroke-width="2.00" />' in \
+        svg.render(incremental=True)
+    trace.line_to(50, 50)
+    assert '30.00,50.00' in svg.render(incremental=True)
+    assert '30.00,50.00' in svg.render()
+
+
+def test_path_must_start_with_move():
+    with pytest.raises(ValueError):
+        Path().line_to(1, 1).d()
+
+
+def test_rendering_does_not_keep_paths_alive():
+    import gc
+    import weakref
+
+    svg = Composer((100, 100))
+    outline = Path(fill='none').move_to(0, 0).line_to(10, 10)
+    svg.add(outline)
+
+    def frame(**kwargs):
+        return outline()
+
+    svg.add(frame)
+    svg.render(incremental=True, instancing=True)
+    references = weakref.ref(outline), weakref.ref(frame)
+    del svg, outline, frame
+    gc.collect()
+    assert references[0]() is None and references[1]() is None
@@ -0,0 +1,61 @@
+"""
+Test indentation of nested groups and the compact (pretty=False) rendering mode.
+"""
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import circle, rect
+
+
+def nested_scene(levels):
+    svg = Composer((100, 100))
+    group = Group()
+    group.add(circle, cx=1, cy=2, r=3)
+    for _ in range(levels - 1):
+        outer = Group()
+        outer.add(group, transform='translate(1,1)')
+        group = outer
+    svg.add(group)
+    svg.add(rect, x=0, y=0, width=10, height=10)
+    return svg
+
+
+def test_nested_groups_are_indented_by_depth():
+    """Each line carries two spaces of indentation per enclosing element."""
+    rendered = nested_scene(10).render()
+    lines = rendered.split('\n')
+
+    assert lines[0].startswith('<svg ')
+    assert lines[-1] == '</svg>'
+    assert '  ' * 11 + '<circle cx="1.00" cy="2.00" r="3.00" />' in lines
+    assert '  <rect x="0.00" y="0.00" width="10.00" height="10.00" />' in lines
+    assert lines.count('  ' * 10 + '<g transform="translate(1,1)">') == 1
+    assert rendered.count('</g>') == 10
+
+
+def test_compact_mode_has_no_whitespace_between_elements():
+    """pretty=False produces the same elements without indentation or line breaks."""
+    svg = nested_scene(3)
+    compact = svg.render(pretty=False)
+
+    assert '\n' not in compact
+    assert '><g' in compact and '</g><rect' in compact
+    assert compact == ''.join(line.strip() for line in svg.render().split('\n'))
+
+
+
+def test_compact_mode_strips_multi_line_results_and_definitions():
+    """Batch elements and multi-line definitions are compacted as well, text content is kept."""
+    import numpy as np
+    from svg_snip.Elements import circles, heart, text
+
+    svg = Composer((100, 100))
+    svg.add(circles, cx=np.array([1, 2, 3]), cy=0, r=1)
+    svg.add(heart, x=5, y=5)
+    svg.add(text, x=0, y=0, content='a  b')
+    compact = svg.render(pretty=False)
+
+    assert '\n' not in compact
+    assert '<defs><g id="heart"><path' in compact
+    assert '/><circle cx="2.00"' in compact
+    assert '>a  b</text>' in compact
+
@@ -0,0 +1,60 @@
+"""
+Test the opt-in profiling of renderings per shape function (Composer.render(profile=...)).
+"""
+
+import json
+
+import numpy as np
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import circle, rect
+from svg_snip.Elements3D import sphere
+from svg_snip.Profiling import RenderProfile, profiling
+
+
+P = np.array([[200., 0, 150, 0], [0, 200, 150, 0], [0, 0, 1, 300]])
+
+
+def make_scene():
+    svg = Composer((300, 300))
+    group = Group('boxes')
+    for i in range(3):
+        group.add(rect, x=i, y=i, width=10, height=10)
+    svg.add(group)
+    for i in range(5):
+        svg.add(circle, cx=i, cy=i, r=2)
+    svg.add(sphere, radius=40)
+    return svg
+
+
+def test_render_profile_counts_calls_bytes_and_groups():
+    svg = make_scene()
+    profile = RenderProfile()
+    output = svg.render(profile=profile, P=P)
+
+    assert output == svg.render(P=P)
+    calls, seconds, size = profile.functions['circle']
+    assert calls == 5 and seconds >= 0
+    assert size == sum(len(circle(cx=i, cy=i, r=2)) for i in range(5))
+    assert profile.functions['rect'][0] == 3
+    assert profile.functions['sphere'][0] == 1
+    assert profile.functions['polygons_with_lighting'][0] == 1  # all 80 faces in one call
+    assert profile.groups["Group 'boxes'"][0] == 1
+    assert profile.groups["Group 'Geodesic Sphere'"][0] == 1
+    # The composer covers the whole subtree, so it is the slowest entry
+    composer_entry = profile.entries()[0]
+    assert (composer_entry.kind, composer_entry.name) == ('group', 'Composer')
+
+    exported = json.loads(profile.to_json())
+    assert exported['functions']['circle']['calls'] == 5
+    assert 'circle' in profile.table()
+
+
+def test_profiling_context_manager_accumulates():
+    svg = make_scene()
+    with profiling() as profile:
+        svg.render(P=P)
+        svg.render(P=P)
+    svg.render(P=P)
+    assert profile.functions['circle'][0] == 10
+    assert profile.groups['Composer'][0] == 2
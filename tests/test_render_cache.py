@@ -0,0 +1,134 @@
+"""
+Test memoization of Group renderings (Group(cache_size=...)).
+"""
+
+import numpy as np
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import circle
+
+
+calls = []
+
+
+def counted_circle(**kwargs):
+    calls.append(kwargs.get('cx'))
+    return circle(**kwargs)
+
+
+counted_circle.accepted_kwargs = circle.accepted_kwargs
+
+
+def make_scene():
+    svg = Composer((100, 100))
+    static = Group(cache_size=2)
+    static.add(counted_circle, cx=10, cy=10, r=1)
+    static.add(counted_circle, cx=20, cy=20, r=1)
+    svg.add(static)
+    return svg, static
+
+
+def test_cached_group_is_not_re_evaluated():
+    """Rendering twice with identical kwargs evaluates the children only once."""
+    svg, _ = make_scene()
+    calls.clear()
+    first = svg.render()
+    second = svg.render()
+    assert first == second
+    assert calls == [10, 20]
+
+
+def test_cache_invalidation():
+    """add(), in-place kwargs changes and different override kwargs invalidate the cache."""
+    svg, static = make_scene()
+    svg.render()
+
+    calls.clear()
+    static.children[0][1]['cx'] = 15
+    assert 'cx="15.00"' in svg.render()
+    assert calls == [15, 20]
+
+    calls.clear()
+    static.add(counted_circle, cx=30, cy=30, r=1)
+    assert 'cx="30.00"' in svg.render()
+    assert calls == [15, 20, 30]
+
+    calls.clear()
+    svg.render(P=np.eye(3, 4))
+    svg.render(P=np.eye(3, 4))
+    svg.render(P=2 * np.eye(3, 4))
+    assert calls == [15, 20, 30] * 2
+
+
+def test_cache_is_bounded():
+    """The least recently used rendering is evicted once cache_size is exceeded."""
+    svg, static = make_scene()
+    for i in range(5):
+        svg.render(P=i)
+    assert len(static._render_cache) == 2
+
+
+def test_incremental_render_reuses_clean_children():
+    """Only children with changed kwargs or changed override kwargs they use are re-evaluated."""
+    def counted_marker(P=None, x=0, **kwargs):
+        calls.append(('marker', x))
+        return circle(cx=x, cy=0, r=1)
+
+    svg = Composer((100, 100))
+    moving = svg.add(counted_circle, cx=1, cy=1, r=1)
+    svg.add(counted_circle, cx=2, cy=2, r=1)
+    group = Group()
+    group.add(counted_marker, x=3)
+    svg.add(group, transform='scale(2)')
+
+    calls.clear()
+    first = svg.render(incremental=True, P=1)
+    assert calls == [1, 2, ('marker', 3)]
+
+    calls.clear()
+    moving[1]['cx'] = 5
+    second = svg.render(incremental=True, P=1)
+    assert calls == [5]
+    assert second == first.replace('cx="1.00"', 'cx="5.00"')
+
+    calls.clear()
+    third = svg.render(incremental=True, P=2)
+    assert calls == [('marker', 3)]
+    assert third == second == svg.render(P=2)
+
+    calls.clear()
+    svg.add(counted_circle, cx=4, cy=4, r=1)
+    assert svg.render(incremental=True, P=2) == svg.render(P=2)
+    assert calls == [4, 5, 2, ('marker', 3), 4]  # the new child, then everything in the full render
+
+    calls.clear()
+    svg.invalidate()
+    svg.render(incremental=True, P=2)
+    assert calls == [5, 2, ('marker', 3), 4]
+
+
+def test_update_renders_everything_by_default():
+    """Shape functions reading global state are evaluated on every update() unless incremental."""
+    state = {'x': 10}
+
+    def follower(**kwargs):
+        return circle(cx=state['x'], cy=0, r=1)
+
+    svg = Composer((100, 100))
+    svg.add(follower)
+    svg.widget = type('Widget', (), {'value': ''})()
+    svg.update(incremental=True)
+    state['x'] = 50
+    svg.update(incremental=True)
+    assert 'cx="10.00"' in svg.widget.value
+    svg.update()
+    assert 'cx="50.00"' in svg.widget.value
+
+
+def test_fingerprint_of_arrays_is_a_digest():
+    from svg_snip.Composer import _fingerprint
+    P = np.arange(12.0).reshape(3, 4)
+    key = _fingerprint(P)
+    assert len(repr(key)) < 100
+    P[0, 0] = 1
+    assert _fingerprint(P) != key
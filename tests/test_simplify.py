@@ -0,0 +1,67 @@
+"""
+Test the Douglas-Peucker and LTTB simplification of polylines and polygons.
+"""
+
+import numpy as np
+
+from svg_snip.Composer import Composer
+from svg_snip.Elements import path, polygon, polyline
+from svg_snip.Simplify import douglas_peucker, lttb, parse_line_path, simplify
+
+
+def distance_to_polyline(points, vertices):
+    """Distance of every point to the closest segment of the polyline through `vertices`."""
+    a, b = vertices[:-1], vertices[1:]
+    ab = b - a
+    t = np.clip(np.einsum('psk,sk->ps', points[:, None] - a, ab) / np.einsum('sk,sk->s', ab, ab), 0, 1)
+    closest = a + t[..., None] * ab
+    return np.min(np.linalg.norm(points[:, None] - closest, axis=-1), axis=1)
+
+
+def test_douglas_peucker_respects_tolerance():
+    x = np.linspace(0, 10, 100000)
+    trace = np.c_[x * 80, 300 + 100 * np.sin(x) + 5 * np.sin(37 * x)]
+    kept = douglas_peucker(trace, 0.5)
+    assert 50 < len(kept) < 5000
+    assert np.array_equal(kept[[0, -1]], trace[[0, -1]])
+    assert distance_to_polyline(trace[::97], kept).max() <= 0.5 + 1e-9
+
+
+def test_lttb_keeps_budget_and_peaks():
+    x = np.arange(100000, dtype=float)
+    y = np.zeros_like(x)
+    y[31415] = 100  # a single spike must survive
+    kept = lttb(np.c_[x, y], 800)
+    assert len(kept) == 800
+    assert 100 in kept[:, 1]
+    assert np.all(np.diff(kept[:, 0]) > 0)
+
+
+def test_elements_accept_simplification_kwargs():
+    x = np.linspace(0, 1, 1001)
+    points = ' '.join(f'{100 * v},{50}' for v in x)  # a straight line
+    assert polyline(points=points, tolerance=0.1) == '<polyline points="0.00,50.00 100.00,50.00" />'
+    assert polygon(points='0,0 1,0.001 2,0 2,2 0,2', tolerance=0.1) == \
+        '<polygon points="0.00,0.00 2.00,0.00 2.00,2.00 0.00,2.00" />'
+    assert path(d='M0,0 L1,0.001 L2,0 L2,5 h-2 z m 5 5 l 1 0 1 0', tolerance=0.1) == \
+        '<path d="M0.00,0.00 L2.00,0.00 2.00,5.00 0.00,5.00 Z M5.00,5.00 L7.00,5.00" />'
+    curved = 'M0,0 C1,1 2,1 3,0'
+    assert parse_line_path(curved) is None
+    assert path(d=curved, tolerance=1) == f'<path d="{curved}" />'
+
+    # The tolerance in pixels depends on the scale of the output
+    svg = Composer((100, 100))
+    svg.scale = 10
+    svg.add(polyline, points=np.c_[x * 100, 50 + 0.05 * np.sin(x * 20)], tolerance_px=0.2)
+    svg.add(polyline, points=np.c_[x * 100, 50 + 0.05 * np.sin(x * 20)], tolerance=0.2)
+    first, second = [line for line in svg.render().split('\n') if 'polyline' in line]
+    assert len(first) > len(second)
+
+
+def test_simplify_closed_polygon():
+    angles = np.linspace(0, 2 * np.pi, 10000, endpoint=False)
+    circle = np.c_[np.cos(angles), np.sin(angles)] * 100
+    kept = simplify(circle, tolerance=0.5, closed=True)
+    assert 10 < len(kept) < 100
+    assert not np.array_equal(kept[0], kept[-1])
+    assert len(simplify(circle, max_points=64, closed=True)) == 64
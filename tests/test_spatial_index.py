@@ -0,0 +1,48 @@
+"""
+Test point and rectangle queries of the SpatialIndex of a group.
+"""
+
+import pickle
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import circle, line, rect, text
+from svg_snip.Spatial import SpatialIndex
+
+
+def test_point_and_rect_queries_follow_additions():
+    svg = Composer((1000, 1000))
+    dots = [svg.add(circle, cx=10 * i, cy=10 * i, r=2, stroke_width=0) for i in range(100)]
+    label = svg.add(text, x=5, y=5, content='no bounds')
+    group = Group()
+    box = group.add(rect, x=0, y=0, width=10, height=10, stroke_width=0)
+    svg.add(group, transform='translate(500 100) scale(2)')
+    index = SpatialIndex(svg, cell_size=50)
+
+    assert len(index) == 101
+    assert index.unindexed == [label]
+    assert index.query_point(30, 30) == [dots[3]]
+    assert index.query_point(31.5, 31.5) == [dots[3]]
+    assert index.query_point(34, 34) == []
+    assert index.query_point(34, 34, tolerance=2.5) == [dots[3]]
+    assert index.query_rect(0, 0, 25, 25) == dots[:3]
+    assert index.query_point(515, 115) == [box]
+    assert index.bbox(box) == (500, 100, 520, 120)
+
+    # Children added later are indexed right away, also in nested groups
+    late = group.add(line, x1=0, y1=0, x2=5, y2=0, stroke_width=0)
+    assert index.query_rect(505, 99, 506, 101) == [box, late]
+    big = svg.add(rect, x=-1e5, y=-1e5, width=2e5, height=2e5)
+    assert big in index.query_point(999, 1)
+    assert len(index.query_rect(-1e6, -1e6, 1e6, 1e6)) == 103
+
+    index.close()
+    svg.add(circle, cx=30, cy=30, r=1)
+    assert index.query_point(30, 30) == [dots[3], big]
+
+
+def test_observers_are_not_pickled():
+    group = Group()
+    index = SpatialIndex(group)
+    group.add(circle, cx=1, cy=1, r=1)
+    assert len(index) == 1
+    assert pickle.loads(pickle.dumps(group))._observers == []
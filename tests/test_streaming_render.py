@@ -0,0 +1,68 @@
+"""
+Test streaming rendering of a Composer via iter_render() and render_to().
+
+The streamed markup must contain the same content as render(), with the
+<defs> block emitted after the content.
+"""
+
+import io
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import arrow, circle
+
+
+def make_scene():
+    svg = Composer((200, 200))
+    svg.add(circle, cx=100, cy=100, r=10, stroke='blue')
+    group = Group()
+    group.add(arrow, x1=10, y1=10, x2=100, y2=10, stroke='red', head='arrow-small')
+    svg.add(group, transform='translate(5,5)')
+    return svg
+
+
+def test_iter_render_matches_render():
+    """Streamed chunks contain the rendered content with the defs at the end."""
+    svg = make_scene()
+    streamed = ''.join(svg.iter_render())
+
+    assert streamed.startswith('<svg ')
+    assert streamed.endswith('</svg>')
+    assert '<circle cx="100.00" cy="100.00" r="10.00" stroke="blue" />' in streamed
+    assert '<g transform="translate(5,5)">' in streamed
+    assert 'id="arrow-small"' in streamed
+    assert streamed.find('<defs>') > streamed.find('<line')
+    assert sorted(streamed.split('\n')) == sorted(svg.render().split('\n'))
+
+
+def test_render_to_text_and_binary_streams():
+    """render_to() accepts text streams as well as binary streams (UTF-8)."""
+    svg = make_scene()
+
+    text_stream = io.StringIO()
+    svg.render_to(text_stream)
+
+    binary_stream = io.BytesIO()
+    svg.render_to(binary_stream)
+
+    assert text_stream.getvalue() == ''.join(svg.iter_render())
+    assert binary_stream.getvalue().decode('utf-8') == text_stream.getvalue()
+
+
+def test_save_svg_and_svgz(tmp_path):
+    """save() picks plain or gzip-compressed output from the file extension."""
+    import gzip
+
+    from svg_snip.Composer import gzip_stream
+
+    svg = make_scene()
+    expected = ''.join(svg.iter_render())
+
+    svg.save(tmp_path / 'scene.svg')
+    svg.save(tmp_path / 'scene.svgz')
+    assert (tmp_path / 'scene.svg').read_text(encoding='utf-8') == expected
+    assert gzip.decompress((tmp_path / 'scene.svgz').read_bytes()).decode('utf-8') == expected
+
+    buffer = io.BytesIO()
+    with gzip_stream(buffer) as stream:
+        svg.render_to(stream)
+    assert gzip.decompress(buffer.getvalue()).decode('utf-8') == expected
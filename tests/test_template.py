@@ -0,0 +1,47 @@
+"""
+Test compiled templates (Composer.compile), which only evaluate children depending on parameters.
+"""
+
+import numpy as np
+import pytest
+
+from svg_snip.Composer import Composer, Group
+from svg_snip.Elements import arrow, circle, rect
+import svg_snip.Elements3D as e3d
+
+
+def test_template_matches_render():
+    """Filling the slots yields the same markup as render(), static children are evaluated once."""
+    calls = []
+
+    def background(**kwargs):
+        calls.append('background')
+        return rect(x=0, y=0, width=300, height=300, fill='white')
+    background.accepted_kwargs = {'fill'}
+
+    svg = Composer((300, 300))
+    svg.add(background)
+    legend = Group()
+    legend.add(arrow, x1=0, y1=0, x2=20, y2=0, head='circle')
+    svg.add(legend, transform='translate(5,5)')
+    svg.add(e3d.wire_cube, min=[-50, -50, -50], max=[50, 50, 50])
+    svg.add(circle, cx=1, cy=2, r=3)
+
+    template = svg.compile(params=['P'])
+    assert calls == ['background']
+    assert len([part for part in template.parts if not isinstance(part, str)]) == 1
+
+    for angle in np.linspace(0, 1, 3):
+        c, s = np.cos(angle), np.sin(angle)
+        P = np.array([[200., 0, 150, 0], [0, 200, 150, 0], [0, 0, 1, 300]]) @ np.array(
+            [[c, -s, 0, 0], [s, c, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]])
+        assert template(P=P) == svg.render(P=P)
+    assert calls == ['background'] * 4
+
+
+def test_template_rejects_unknown_parameters():
+    svg = Composer((10, 10))
+    with pytest.raises(ValueError):
+        svg.compile(params=['transform'])
+    with pytest.raises(TypeError):
+        svg.compile(params=['P'])(Q=1)